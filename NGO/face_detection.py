@@ -1,9 +1,25 @@
-from deepface import DeepFace
+"""
+Check images for a real (non-spoofed) face.
 
-image_path = r"img1.JPEG"
+Uses the warm service in python/face_detection_service.py, so start that
+once first instead of loading DeepFace on every run:
 
-try:
-    DeepFace.extract_faces(img_path=image_path)
-    print("Real face detected")
-except:
-    print("No real face detected")
+    python python/face_detection_service.py &
+    python face_detection.py img1.JPEG img2.jpg
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "python"))
+from face_detection_service import detect_faces
+
+image_paths = sys.argv[1:] or [r"img1.JPEG"]
+
+for path, result in zip(image_paths, detect_faces(image_paths)):
+    if "error" in result:
+        print(f"{path}: {result['error']}")
+    elif any(face["is_real"] for face in result["faces"]):
+        print(f"{path}: Real face detected")
+    else:
+        print(f"{path}: No real face detected")
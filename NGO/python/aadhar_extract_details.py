@@ -1,50 +1,328 @@
-from ultralytics import YOLO
+"""
+Aadhaar card field extraction: YOLO field detection + Tesseract OCR.
+
+    python aadhar_extract_details.py card.jpg
+    python aadhar_extract_details.py cards/ --out details.jsonl
+    python aadhar_extract_details.py batch.tar.gz --out details.jsonl
+
+Bulk runs stream cards from a directory or tarball through decode -> detect
+-> OCR stages connected by bounded queues, load the detector once, and write
+one JSON line per card with per-stage timings. Cards already extracted into
+--out are skipped without being read (failed ones are tried again), so an
+interrupted run can simply be restarted.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
 import cv2
-from huggingface_hub import hf_hub_download
-from supervision import Detections
-import pytesseract
+import numpy as np
+
+from classifier_service import IMAGE_EXTENSIONS
+from model_backend import MODELS_DIR, SUFFIXES, default_backend, load_yolo
 
-# Path to tesseract executable 
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Path to tesseract executable (default: `tesseract` on PATH)
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
 
-#Download model
+# Field detector weights on the Hugging Face Hub, fetched into models/ when missing
 repo_config = dict(
     repo_id = "arnabdhar/YOLOv8-nano-aadhar-card",
     filename = "model.pt",
-    local_dir = "./models"
+    local_dir = str(MODELS_DIR)
 )
 
-# Load model
-model = YOLO("models/model.pt")
-id2reg = model.names
+custom_config = r'--oem 3 --psm 6'
+
+# Per-process OCR engine: a reused tesserocr API handle if available, else pytesseract
+_tess_api = None
+_ocr_ready = False
+
+
+def init_ocr_worker(tesseract_cmd=TESSERACT_CMD):
+    """Pool initializer: create one tesserocr handle per worker process."""
+    global _tess_api, _ocr_ready
+    try:
+        from tesserocr import OEM, PSM, PyTessBaseAPI
+        _tess_api = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, oem=OEM.DEFAULT)
+    except ImportError:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        _tess_api = None
+    _ocr_ready = True
+
+
+def ocr_region(region):
+    """OCR one preprocessed region (same settings as --oem 3 --psm 6)."""
+    if not _ocr_ready:
+        init_ocr_worker()
+    if _tess_api is not None:
+        from PIL import Image
+        _tess_api.SetImage(Image.fromarray(region))
+        return _tess_api.GetUTF8Text().strip()
+    import pytesseract
+    return pytesseract.image_to_string(region, config=custom_config).strip()
+
 
-# Path to the Aadhar Card image
-image_path = "aadhar_test_img_3.jpg"
-img = cv2.imread(image_path)
+def make_ocr_pool(workers=4, tesseract_cmd=TESSERACT_CMD):
+    """Process pool for OCR; reuse it across cards so workers stay warm."""
+    # spawn: workers start on first submit, when decode/detect threads and the
+    # detector's own threads are already running; never fork that process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                               initializer=init_ocr_worker, initargs=(tesseract_cmd,))
+
+
+def ensure_detector_weights():
+    """Download models/model.pt from the Hub if it is not there yet."""
+    if (MODELS_DIR / repo_config["filename"]).exists():
+        return
+    from huggingface_hub import hf_hub_download
+
+    print(f"Downloading {repo_config['filename']} from {repo_config['repo_id']}...", file=sys.stderr)
+    hf_hub_download(**repo_config)
 
-# Detect regions of interest from the image using trained model
-detections = Detections.from_ultralytics(model.predict(img)[0])
-xyxy_list = detections.xyxy
-class_list = detections.class_id
 
 # Helper function for extracting image regions
 def extract_region(img, xyxy):
     x1, y1, x2, y2 = [int(coordinate) for coordinate in xyxy]
     return img[y1:y2, x1:x2]
-    
-# Read and process image
-img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) #Convert to grayscale
-img = cv2.medianBlur(img, 3)
-# img = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2) # Adaptive Thresholding
-_, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU) # Otsu Thresholding
 
-custom_config = r'--oem 3 --psm 6'
-# Show image regions
-for i, xyxy in zip(class_list, xyxy_list):
-    print(f'{id2reg[i]}: \n {xyxy}')
-    preprocessed_region = extract_region(img, xyxy)
-    # cv2.imshow(f'{id2reg[i]}', preprocessed_region)
-    print(f'{id2reg[i]} contains {pytesseract.image_to_string(preprocessed_region, config = custom_config).strip()}')
-
-# cv2.waitKey(0)
-# cv2.destroyAllWindows()
+
+def preprocess_region(region):
+    """Grayscale, median blur and Otsu threshold on one crop only."""
+    region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) #Convert to grayscale
+    region = cv2.medianBlur(region, 3)
+    # region = cv2.adaptiveThreshold(region, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2) # Adaptive Thresholding
+    _, region = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU) # Otsu Thresholding
+    return region
+
+
+def detect_fields(model, img):
+    """Detect regions of interest; keep the most confident box per field."""
+    boxes = model.predict(img, verbose=False)[0].boxes
+    id2reg = model.names
+    best = {}
+    for xyxy, class_id, conf in zip(boxes.xyxy.tolist(), boxes.cls.tolist(), boxes.conf.tolist()):
+        label = id2reg[int(class_id)]
+        if label not in best or conf > best[label][1]:
+            best[label] = (xyxy, conf)
+    return best
+
+
+def crop_fields(img, model):
+    """Detect fields and return (labels, detections, preprocessed crops)."""
+    fields = detect_fields(model, img)
+    labels = list(fields)
+    regions = [preprocess_region(extract_region(img, fields[label][0])) for label in labels]
+    return labels, fields, regions
+
+
+def format_fields(labels, fields, texts):
+    return {
+        label: {
+            "text": text,
+            "conf": round(fields[label][1], 4),
+            "box": [int(c) for c in fields[label][0]],
+        }
+        for label, text in zip(labels, texts)
+    }
+
+
+def extract_details(img, model, pool=None):
+    """Detect the Aadhaar fields in a BGR image and OCR them.
+
+    Only the detected crops are preprocessed. With a pool (see make_ocr_pool)
+    all fields are OCR'd concurrently, so a card takes as long as its slowest
+    field. Returns {field: {"text", "conf", "box"}}.
+    """
+    labels, fields, regions = crop_fields(img, model)
+    if pool is not None:
+        texts = list(pool.map(ocr_region, regions))
+    else:
+        texts = [ocr_region(region) for region in regions]
+    return format_fields(labels, fields, texts)
+
+
+def iter_cards(source, skip=()):
+    """Yield (card_id, raw bytes) from an image file, a directory or a tarball.
+
+    Tarballs are read as a stream, so they are never unpacked to disk. Cards
+    whose id is in skip are passed over without reading their bytes.
+    """
+    source = Path(source)
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            card_id = path.relative_to(source).as_posix()
+            if path.suffix.lower() in IMAGE_EXTENSIONS and card_id not in skip:
+                yield card_id, path.read_bytes()
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, mode="r|*") as tar:
+            for member in tar:
+                if (member.isfile() and Path(member.name).suffix.lower() in IMAGE_EXTENSIONS
+                        and member.name not in skip):
+                    yield member.name, tar.extractfile(member).read()
+    elif source.name not in skip:
+        yield source.name, source.read_bytes()
+
+
+def load_done_ids(out_path):
+    """Card ids already extracted into out_path by an earlier run (failed cards are retried)."""
+    done = set()
+    if not out_path or not Path(out_path).exists():
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "id" in record and "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+_DONE = object()
+
+
+def run_pipeline(cards, model, pool, decoders=2, queue_size=32):
+    """Yield one result dict per card, in completion order.
+
+    reader -> decode_q -> decoders -> detect_q -> detector -> ocr_q -> caller.
+    Each queue is bounded, so at most a few dozen cards are in memory at once
+    and a slow stage back-pressures the ones before it. A card that fails in
+    a stage comes out as {"id", "error"}; every stage sends its shutdown
+    signal even when it fails, and an error reading the source is raised
+    once the cards read before it are out.
+    """
+    decode_q = queue.Queue(queue_size)
+    detect_q = queue.Queue(queue_size)
+    ocr_q = queue.Queue(queue_size)
+    source_errors = []
+
+    def reader():
+        try:
+            for card in cards:
+                decode_q.put(card)
+        except Exception as e:
+            source_errors.append(e)
+        finally:
+            for _ in range(decoders):
+                decode_q.put(_DONE)
+
+    def decoder():
+        try:
+            while (item := decode_q.get()) is not _DONE:
+                card_id, data = item
+                started = time.perf_counter()
+                try:
+                    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                    error = None if img is not None else "could not decode image"
+                except Exception as e:
+                    img, error = None, f"could not decode image: {str(e).strip()}"
+                timings = {"decode": time.perf_counter() - started}
+                detect_q.put((card_id, img, timings, error))
+        finally:
+            detect_q.put(_DONE)
+
+    def detector():
+        remaining = decoders
+        try:
+            while remaining:
+                item = detect_q.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                card_id, img, timings, error = item
+                if error:
+                    ocr_q.put((card_id, timings, None, error))
+                    continue
+                started = time.perf_counter()
+                try:
+                    labels, fields, regions = crop_fields(img, model)
+                    timings["detect"] = time.perf_counter() - started
+                    # OCR runs in the process pool; the caller waits on the futures
+                    futures = [pool.submit(ocr_region, region) for region in regions]
+                except Exception as e:
+                    ocr_q.put((card_id, timings, None, str(e) or type(e).__name__))
+                    continue
+                timings["ocr_submitted"] = time.perf_counter()
+                ocr_q.put((card_id, timings, (labels, fields, futures), None))
+        finally:
+            ocr_q.put(_DONE)
+
+    threads = [threading.Thread(target=reader, daemon=True),
+               threading.Thread(target=detector, daemon=True)]
+    threads += [threading.Thread(target=decoder, daemon=True) for _ in range(decoders)]
+    for thread in threads:
+        thread.start()
+
+    while (item := ocr_q.get()) is not _DONE:
+        card_id, timings, detected, error = item
+        result = {"id": card_id}
+        if detected is not None:
+            labels, fields, futures = detected
+            try:
+                result["fields"] = format_fields(labels, fields, [f.result() for f in futures])
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            timings["ocr"] = time.perf_counter() - timings.pop("ocr_submitted")
+        if error:
+            result["error"] = error
+        result["timings_ms"] = {stage: round(secs * 1000, 1) for stage, secs in timings.items()}
+        yield result
+    if source_errors:
+        raise source_errors[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract Aadhaar card details from images.")
+    parser.add_argument("source", help="image file, directory of images, or tarball")
+    parser.add_argument("--out", help="JSON-lines output file, appended to (default: stdout)")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--decoders", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=32, help="max cards buffered per stage")
+    parser.add_argument("--backend", choices=list(SUFFIXES), help="default: $AADHAR_BACKEND or pytorch")
+    parser.add_argument("--tesseract-cmd", default=TESSERACT_CMD)
+    args = parser.parse_args(argv)
+
+    done = load_done_ids(args.out)
+    cards = iter_cards(args.source, skip=done)
+    if done:
+        print(f"Skipping {len(done)} card(s) already in {args.out}", file=sys.stderr)
+
+    if (args.backend or default_backend()) == "pytorch":
+        ensure_detector_weights()
+    model = load_yolo("model", args.backend)
+    out = open(args.out, "a", encoding="utf-8") if args.out else sys.stdout
+    started = time.perf_counter()
+    count = failed = 0
+    totals = {}
+    try:
+        with make_ocr_pool(args.ocr_workers, args.tesseract_cmd) as pool:
+            for result in run_pipeline(cards, model, pool, args.decoders, args.queue_size):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                count += 1
+                failed += "error" in result
+                for stage, ms in result["timings_ms"].items():
+                    totals[stage] = totals.get(stage, 0.0) + ms
+    finally:
+        if args.out:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    means = ", ".join(f"{stage} {ms / count:.0f}ms" for stage, ms in totals.items()) if count else "-"
+    print(f"Processed {count} card(s), {failed} failed, in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:.1f}/s); mean per card: {means}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
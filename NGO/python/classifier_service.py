@@ -0,0 +1,128 @@
+"""
+Shared Aadhaar card classifier with micro-batching.
+
+One ClassifierService holds a single copy of the YOLO classifier weights
+for the whole process. Requests that arrive within a few milliseconds of
+each other are stacked into one forward pass and the top-1 class and
+confidence are handed back to each caller.
+
+It also has an offline bulk mode for backfilling registrations:
+
+    python classifier_service.py path/to/cards --out results.jsonl
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image
+
+from model_backend import SUFFIXES, load_yolo
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class ClassifierService:
+    """Process-wide classifier; classify() calls are micro-batched on a worker thread."""
+
+    def __init__(self, backend=None, max_batch=16, max_wait_ms=5):
+        self.model = load_yolo("aadhar_classifier", backend)
+        self.names = self.model.names
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="aadhar-classifier", daemon=True)
+        self._worker.start()
+
+    def predict(self, images):
+        """One forward pass over a list of images; return [(class_name, confidence)]."""
+        results = self.model(images, verbose=False)
+        return [(self.names[r.probs.top1], float(r.probs.top1conf)) for r in results]
+
+    def submit(self, image):
+        """Queue one image; the Future resolves to (class_name, confidence)."""
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def classify(self, image, timeout=30):
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        """Block for one request, then take whatever else arrives within max_wait."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                predictions = self.predict([image for image, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+
+def iter_images(directory):
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            yield path
+
+
+def classify_directory(service, directory, batch_size=32):
+    """Yield one result dict per image under directory, classified in batches."""
+    paths = list(iter_images(directory))
+    for start in range(0, len(paths), batch_size):
+        batch, images = [], []
+        for path in paths[start:start + batch_size]:
+            try:
+                images.append(Image.open(path).convert("RGB"))
+                batch.append(path)
+            except Exception as e:
+                yield {"file": str(path), "error": str(e)}
+        if not images:
+            continue
+        for path, (class_name, conf) in zip(batch, service.predict(images)):
+            yield {"file": str(path), "class": class_name, "conf": round(conf, 4),
+                   "is_aadhar": class_name.lower() == "aadhar"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify every card image in a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--out", help="JSON-lines output file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backend", choices=list(SUFFIXES), help="default: $AADHAR_BACKEND or pytorch")
+    args = parser.parse_args()
+
+    service = ClassifierService(args.backend)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    started = time.perf_counter()
+    count = 0
+    try:
+        for result in classify_directory(service, args.directory, args.batch_size):
+            out.write(json.dumps(result) + "\n")
+            count += 1
+    finally:
+        if args.out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"Classified {count} image(s) in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f}/s)",
+          file=sys.stderr)
@@ -0,0 +1,128 @@
+"""
+Export the Aadhaar YOLO models to ONNX for CPU inference.
+
+    python export_onnx.py                 # export models/*.pt to ONNX
+    python export_onnx.py --int8          # ... plus a dynamically quantized INT8 copy
+    python export_onnx.py --check         # top-1 parity against PyTorch on the NGO/ sample images
+    python export_onnx.py --bench 20      # latency / throughput per backend
+
+Use the exported weights with AADHAR_BACKEND=onnx or AADHAR_BACKEND=onnx-int8.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from model_backend import MODELS, load_yolo, model_path
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def sample_images():
+    return [Image.open(p).convert("RGB") for p in sorted(SAMPLE_DIR.iterdir())
+            if p.suffix.lower() in SAMPLE_EXTENSIONS]
+
+
+def export(name, imgsz=None):
+    """Export models/<name>.pt to models/<name>.onnx with a dynamic batch axis."""
+    from ultralytics import YOLO
+
+    model = YOLO(str(model_path(name, "pytorch")))
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    return Path(model.export(format="onnx", dynamic=True, simplify=True, **kwargs))
+
+
+def quantize(name):
+    """Write models/<name>_int8.onnx with INT8 dynamically quantized weights."""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    src, dst = model_path(name, "onnx"), model_path(name, "onnx-int8")
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QUInt8, per_channel=True)
+
+    # Keep the ultralytics metadata (task, class names, imgsz) the quantizer drops
+    source, quantized = onnx.load(str(src)), onnx.load(str(dst))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, str(dst))
+    return dst
+
+
+def top1(model, images):
+    """Per-image summary used for parity: top-1 class, or sorted detected classes."""
+    results = model(images, verbose=False)
+    if model.task == "classify":
+        return [model.names[r.probs.top1] for r in results]
+    return [sorted(model.names[int(c)] for c in r.boxes.cls) for r in results]
+
+
+def check_parity(name, backends, images):
+    reference = top1(load_yolo(name, "pytorch"), images)
+    ok = True
+    for backend in backends:
+        got = top1(load_yolo(name, backend), images)
+        mismatches = sum(a != b for a, b in zip(reference, got))
+        ok &= mismatches == 0
+        print(f"  {backend:<10} {len(images) - mismatches}/{len(images)} match PyTorch")
+    return ok
+
+
+def benchmark(name, backends, images, iterations):
+    print(f"  {'backend':<10} {'load':>8} {'latency':>10} {'batch':>12}")
+    for backend in backends:
+        started = time.perf_counter()
+        model = load_yolo(name, backend)
+        model(images[:1], verbose=False)  # warm-up
+        load_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(iterations):
+            model(images[i % len(images)], verbose=False)
+        latency = (time.perf_counter() - started) / iterations
+
+        started = time.perf_counter()
+        for _ in range(max(1, iterations // len(images))):
+            model(images, verbose=False)
+        per_image = (time.perf_counter() - started) / (max(1, iterations // len(images)) * len(images))
+
+        print(f"  {backend:<10} {load_s:>7.2f}s {latency * 1000:>8.1f}ms {1 / per_image:>8.1f} img/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Aadhaar YOLO models to ONNX.")
+    parser.add_argument("--models", nargs="*", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--int8", action="store_true", help="also write a dynamically quantized INT8 copy")
+    parser.add_argument("--imgsz", type=int, help="export image size (default: training size)")
+    parser.add_argument("--skip-export", action="store_true", help="only check / benchmark existing files")
+    parser.add_argument("--check", action="store_true", help="top-1 parity on the sample images in NGO/")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark N single-image calls per backend")
+    args = parser.parse_args()
+
+    images = sample_images()
+    all_ok = True
+    for name in args.models:
+        if not model_path(name, "pytorch").exists():
+            print(f"⊘ {name}: {model_path(name, 'pytorch')} not found, skipping")
+            continue
+
+        print(f"📦 {name}")
+        if not args.skip_export:
+            print(f"  ✓ Exported {export(name, args.imgsz)}")
+            if args.int8:
+                print(f"  ✓ Quantized {quantize(name)}")
+
+        backends = [b for b in ("onnx", "onnx-int8") if model_path(name, b).exists()]
+        if args.check:
+            all_ok &= check_parity(name, backends, images)
+        if args.bench:
+            benchmark(name, ["pytorch"] + backends, images, args.bench)
+
+    if args.check and not all_ok:
+        raise SystemExit("✗ Exported model disagrees with PyTorch on some sample images")
+
+
+if __name__ == "__main__":
+    main()
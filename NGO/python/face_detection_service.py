@@ -0,0 +1,193 @@
+"""
+Long-lived face detection + anti-spoofing service.
+
+DeepFace/TensorFlow take tens of seconds to import and load, so they are
+loaded once here and kept warm behind a local HTTP endpoint:
+
+    python face_detection_service.py --backend retinaface --port 8765
+
+    POST /detect   multipart field `images` (one or more files)
+                   -> {"backend", "elapsed_ms", "results": [{"faces": [...]} | {"error"}]}
+    POST /embed    same input; faces carry an "embedding" (and its "model") instead of spoofing scores
+    GET  /health   -> {"backend", "anti_spoofing", "uptime_s", "images_served"}
+
+Each face is {"box": [x, y, w, h], "confidence", "is_real", "antispoof_score"}.
+Callers (the Streamlit face page, batch jobs) use detect_faces() and
+embed_faces().
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ["opencv", "ssd", "mtcnn", "retinaface", "yunet", "centerface"]
+EMBEDDING_MODELS = ["Facenet512", "Facenet", "ArcFace", "VGG-Face", "SFace"]
+DEFAULT_URL = os.getenv("FACE_SERVICE_URL", "http://127.0.0.1:8765")
+
+
+class FaceDetector:
+    """DeepFace extract_faces with the detector backend fixed and loaded at startup."""
+
+    def __init__(self, backend="opencv", anti_spoofing=True, embedding_model="Facenet512"):
+        from deepface import DeepFace
+
+        self._deepface = DeepFace
+        self.backend = backend
+        self.anti_spoofing = anti_spoofing
+        self.embedding_model = embedding_model
+        # TensorFlow/torch models are not safe to call from several Flask threads at once
+        self._lock = threading.Lock()
+        # Build and cache the models before the first request
+        warmup = np.zeros((224, 224, 3), dtype=np.uint8)
+        self.detect(warmup)
+        self.embed(warmup)
+
+    def detect(self, image):
+        """Faces in one BGR image; an image without faces gives []."""
+        with self._lock:
+            faces = self._deepface.extract_faces(
+                img_path=image,
+                detector_backend=self.backend,
+                enforce_detection=False,
+                anti_spoofing=self.anti_spoofing,
+            )
+        results = []
+        for face in faces:
+            # With enforce_detection=False "no face" comes back as the whole image at confidence 0
+            if not face.get("confidence"):
+                continue
+            area = face["facial_area"]
+            results.append({
+                "box": [int(area["x"]), int(area["y"]), int(area["w"]), int(area["h"])],
+                "confidence": round(float(face["confidence"]), 4),
+                "is_real": bool(face.get("is_real", False)),
+                "antispoof_score": round(float(face.get("antispoof_score", 0.0)), 4),
+            })
+        return results
+
+    def embed(self, image):
+        """Aligned face embeddings in one BGR image, as plain lists."""
+        with self._lock:
+            faces = self._deepface.represent(
+                img_path=image,
+                model_name=self.embedding_model,
+                detector_backend=self.backend,
+                enforce_detection=False,
+            )
+        results = []
+        for face in faces:
+            if not face.get("face_confidence"):
+                continue
+            area = face["facial_area"]
+            results.append({
+                "box": [int(area["x"]), int(area["y"]), int(area["w"]), int(area["h"])],
+                "confidence": round(float(face["face_confidence"]), 4),
+                "model": self.embedding_model,
+                "embedding": [float(v) for v in face["embedding"]],
+            })
+        return results
+
+    def run_batch(self, method, images):
+        results = []
+        for image in images:
+            if image is None:
+                results.append({"error": "could not decode image"})
+                continue
+            try:
+                results.append({"faces": method(image)})
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+
+    def detect_batch(self, images):
+        return self.run_batch(self.detect, images)
+
+    def embed_batch(self, images):
+        return self.run_batch(self.embed, images)
+
+
+def create_app(detector):
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+    started = time.time()
+    served = {"images": 0}
+
+    def handle(run):
+        files = request.files.getlist("images")
+        if not files:
+            return jsonify(error="send one or more files in the multipart field 'images'"), 400
+        t0 = time.perf_counter()
+        images = [cv2.imdecode(np.frombuffer(f.read(), np.uint8), cv2.IMREAD_COLOR) for f in files]
+        results = run(images)
+        served["images"] += len(images)
+        return jsonify(backend=detector.backend, results=results,
+                       elapsed_ms=round((time.perf_counter() - t0) * 1000, 1))
+
+    @app.post("/detect")
+    def detect():
+        return handle(detector.detect_batch)
+
+    @app.post("/embed")
+    def embed():
+        return handle(detector.embed_batch)
+
+    @app.get("/health")
+    def health():
+        return jsonify(backend=detector.backend, anti_spoofing=detector.anti_spoofing,
+                       embedding_model=detector.embedding_model,
+                       uptime_s=round(time.time() - started), images_served=served["images"])
+
+    return app
+
+
+def encode_image(image):
+    """Bytes for a file path, raw bytes, or a BGR ndarray."""
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if isinstance(image, np.ndarray):
+        ok, buf = cv2.imencode(".jpg", image)
+        if not ok:
+            raise ValueError("could not encode image")
+        return buf.tobytes()
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def post_images(endpoint, images, url=DEFAULT_URL, timeout=60, session=None):
+    import requests
+
+    files = [("images", (f"{i}.jpg", encode_image(image), "application/octet-stream"))
+             for i, image in enumerate(images)]
+    response = (session or requests).post(f"{url.rstrip('/')}/{endpoint}", files=files, timeout=timeout)
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+def detect_faces(images, url=DEFAULT_URL, timeout=60, session=None):
+    """Send a batch of images (paths, bytes or BGR arrays) to the service; one result per image."""
+    return post_images("detect", images, url, timeout, session)
+
+
+def embed_faces(images, url=DEFAULT_URL, timeout=60, session=None):
+    """Like detect_faces(), but each face carries its embedding."""
+    return post_images("embed", images, url, timeout, session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve DeepFace face detection + anti-spoofing.")
+    parser.add_argument("--backend", default="opencv", choices=BACKENDS)
+    parser.add_argument("--no-anti-spoofing", action="store_true")
+    parser.add_argument("--embedding-model", default="Facenet512", choices=EMBEDDING_MODELS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    detector = FaceDetector(args.backend, not args.no_anti_spoofing, args.embedding_model)
+    print(f"Loaded {args.backend} detector and {args.embedding_model} in {time.perf_counter() - t0:.1f}s")
+    create_app(detector).run(host=args.host, port=args.port, threaded=True)
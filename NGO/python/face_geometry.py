@@ -0,0 +1,130 @@
+"""
+Selfie framing and pose checks on FaceMesh landmarks.
+
+Landmarks are the normalized (N, 3) arrays returned by FaceMeshPool.
+measure() works on one face (N, 2+) or a stack of faces (B, N, 2+) with
+per-face image sizes, so thresholds can be tuned offline on stored
+landmark arrays without re-running MediaPipe:
+
+    python face_geometry.py landmarks.npz --min-face-ratio 0.12
+
+where the .npz holds `landmarks` (B, N, 3) and `sizes` (B, 2) as (w, h).
+"""
+
+import argparse
+
+import numpy as np
+
+LEFT_EYE = 33
+RIGHT_EYE = 263
+NOSE = 1
+
+THRESHOLDS = dict(
+    min_face_ratio=0.15,      # face bbox area / image area (reject background-dominant shots)
+    max_center_offset=0.15,   # bbox center offset from image center, per axis, as image fraction
+    min_aspect=1.05,          # face height / width (reject full-body shots)
+    max_aspect=1.7,
+    max_tilt=0.05,            # eye height difference / face height
+    max_nose_offset=0.07,     # nose offset from eye midpoint / face width
+)
+
+# Checks in the order validate_selfie_face reports them
+MESSAGES = (
+    ("size", "Face too small / background too dominant"),
+    ("centered", "Face not centered"),
+    ("aspect", "Invalid aspect ratio"),
+    ("tilt", "Head tilted"),
+    ("frontal", "Face not frontal"),
+)
+
+
+def to_pixels(landmarks, w, h):
+    """(…, N, 2) integer pixel coordinates, truncated like int(x * w)."""
+    landmarks = np.asarray(landmarks, dtype=np.float32)[..., :2]
+    size = np.stack([np.asarray(w), np.asarray(h)], axis=-1)[..., None, :]
+    return np.trunc(landmarks * size).astype(np.int32)
+
+
+def measure(landmarks, w, h):
+    """Bounding box and raw geometry measurements for one face or a stack of faces."""
+    pts = to_pixels(landmarks, w, h)
+    w = np.asarray(w, dtype=np.float32)
+    h = np.asarray(h, dtype=np.float32)
+
+    low = np.maximum(pts.min(axis=-2), 0)
+    high = np.minimum(pts.max(axis=-2), np.stack([w, h], axis=-1).astype(np.int32))
+    face_w, face_h = np.moveaxis(high - low, -1, 0).astype(np.float32)
+    center = (low + high) / 2
+
+    left, right, nose = pts[..., LEFT_EYE, :], pts[..., RIGHT_EYE, :], pts[..., NOSE, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "bbox": np.concatenate([low, high], axis=-1),
+            "face_ratio": face_w * face_h / (w * h),
+            "offset_x": np.abs(center[..., 0] - w / 2) / w,
+            "offset_y": np.abs(center[..., 1] - h / 2) / h,
+            "aspect": face_h / face_w,
+            "tilt": np.abs(left[..., 1] - right[..., 1]) / face_h,
+            "nose_offset": np.abs(nose[..., 0] - (left[..., 0] + right[..., 0]) / 2) / face_w,
+        }
+
+
+def checks(m, thresholds=THRESHOLDS):
+    """Boolean pass/fail per check (arrays for stacked input)."""
+    t = thresholds
+    return {
+        "size": m["face_ratio"] >= t["min_face_ratio"],
+        "centered": (m["offset_x"] <= t["max_center_offset"]) & (m["offset_y"] <= t["max_center_offset"]),
+        "aspect": (m["aspect"] >= t["min_aspect"]) & (m["aspect"] <= t["max_aspect"]),
+        "tilt": m["tilt"] <= t["max_tilt"],
+        "frontal": m["nose_offset"] <= t["max_nose_offset"],
+    }
+
+
+def quality_score(m, thresholds=THRESHOLDS):
+    """0..1 score: mean headroom over the checks (1 = ideal, 0 = at or past a threshold)."""
+    t = thresholds
+    mid = (t["min_aspect"] + t["max_aspect"]) / 2
+    half = (t["max_aspect"] - t["min_aspect"]) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        headroom = np.stack([
+            1 - t["min_face_ratio"] / m["face_ratio"],
+            1 - np.maximum(m["offset_x"], m["offset_y"]) / t["max_center_offset"],
+            1 - np.abs(m["aspect"] - mid) / half,
+            1 - m["tilt"] / t["max_tilt"],
+            1 - m["nose_offset"] / t["max_nose_offset"],
+        ])
+    return np.nan_to_num(np.clip(headroom, 0, 1)).mean(axis=0)
+
+
+def evaluate(landmarks, w, h, thresholds=THRESHOLDS):
+    """Single face: (ok, message, bbox, score, measurements)."""
+    m = measure(landmarks, w, h)
+    score = float(quality_score(m, thresholds))
+    bbox = tuple(int(v) for v in m["bbox"])
+    passed = checks(m, thresholds)
+    for name, message in MESSAGES:
+        if not passed[name]:
+            return False, message, bbox, score, m
+    return True, "Valid face image", bbox, score, m
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate selfie geometry thresholds on stored landmarks.")
+    parser.add_argument("npz", help="file with landmarks (B, N, 3) and sizes (B, 2) as (w, h)")
+    for name, value in THRESHOLDS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=value)
+    args = parser.parse_args()
+
+    data = np.load(args.npz)
+    sizes = data["sizes"]
+    thresholds = {name: getattr(args, name) for name in THRESHOLDS}
+    m = measure(data["landmarks"], sizes[:, 0], sizes[:, 1])
+    passed = checks(m, thresholds)
+    scores = quality_score(m, thresholds)
+
+    total = len(scores)
+    print(f"{total} face(s), {np.logical_and.reduce(list(passed.values())).sum()} pass all checks")
+    for name, ok in passed.items():
+        print(f"  {name:<9} fails {total - ok.sum()}")
+    print(f"  quality  p10 {np.percentile(scores, 10):.2f}  p50 {np.percentile(scores, 50):.2f}")
@@ -0,0 +1,215 @@
+"""
+Pool of MediaPipe FaceMesh workers shared by all verification sessions.
+
+MediaPipe graphs must not be used from several threads at once, so each
+worker process owns its own FaceMesh and requests are queued to them.
+At most `max_pending` requests are queued or running; callers beyond that
+wait up to their timeout for a slot. Landmarks come back as one (468|478, 3)
+float32 array of normalized x, y, z per face. If a worker dies (a MediaPipe
+crash, the OOM killer) the broken executor is replaced with a fresh one.
+
+Benchmark throughput on local images:
+
+    python face_mesh_pool.py ../img2.jpg ../OIP.jpg --workers 4 --requests 200
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+DEFAULT_OPTIONS = dict(
+    static_image_mode=True,
+    max_num_faces=2,
+    refine_landmarks=True,
+    min_detection_confidence=0.5,
+)
+
+# Per-process FaceMesh, created by the pool initializer
+_mesh = None
+
+
+def _init_worker(options):
+    global _mesh
+    import mediapipe as mp
+    _mesh = mp.solutions.face_mesh.FaceMesh(**options)
+
+
+def _process(image):
+    """Run FaceMesh in a worker; return (faces, seconds spent in the worker)."""
+    started = time.perf_counter()
+    results = _mesh.process(image)
+    faces = [np.array([(p.x, p.y, p.z) for p in face.landmark], dtype=np.float32)
+             for face in results.multi_face_landmarks or []]
+    return faces, time.perf_counter() - started
+
+
+class FaceMeshPool:
+    """FaceMesh worker processes behind a bounded request queue."""
+
+    def __init__(self, workers=None, max_pending=None, timeout=10, max_side=1280, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.timeout = timeout
+        self.max_side = max_side
+        self._options = {**DEFAULT_OPTIONS, **options}
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counts = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "restarts": 0}
+        self._latencies = deque(maxlen=1000)
+        self._service_times = deque(maxlen=1000)
+
+    def _new_executor(self):
+        # spawn: never fork a threaded Streamlit server
+        return ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self._options,))
+
+    def _replace_executor(self, broken):
+        """Swap in a new executor for a broken one (once, however many callers noticed)."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+            self._counts["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, image):
+        """(executor, future) on the current executor, replacing it once if it turns out to be broken."""
+        executor = self._executor
+        try:
+            return executor, executor.submit(_process, image)
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            executor = self._executor
+            return executor, executor.submit(_process, image)
+
+    def shrink(self, image):
+        """Landmarks are normalized, so a smaller copy gives the same geometry for less IPC."""
+        h, w = image.shape[:2]
+        scale = self.max_side / max(h, w)
+        if scale >= 1:
+            return image
+        return cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+    def process(self, image, timeout=None):
+        """Landmarks for each face in an RGB image.
+
+        Raises TimeoutError if no slot frees up or the worker doesn't answer
+        within `timeout` seconds (default: the pool's timeout).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            self._count("rejected")
+            raise TimeoutError(f"face analysis busy: {self.max_pending} requests pending")
+
+        with self._lock:
+            self._pending += 1
+        try:
+            executor, future = self._submit(self.shrink(image))
+        except Exception:
+            self._release(None)
+            self._count("failed")
+            raise
+        # The slot is held until the worker finishes, even if the caller gives up
+        future.add_done_callback(self._release)
+
+        remaining = max(0.0, timeout - (time.perf_counter() - started))
+        try:
+            faces, service = future.result(remaining)
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeouts")
+            raise TimeoutError(f"face analysis took longer than {timeout}s") from None
+        except BrokenProcessPool:
+            # A worker died with this request; later ones get a fresh pool
+            self._count("failed")
+            self._replace_executor(executor)
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+
+        with self._lock:
+            self._counts["completed"] += 1
+            self._latencies.append(time.perf_counter() - started)
+            self._service_times.append(service)
+        return faces
+
+    def prewarm(self, timeout=120):
+        """Start every worker and build its FaceMesh now instead of on the first upload."""
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        futures = [self._submit(blank)[1] for _ in range(self.workers)]
+        for future in futures:
+            future.result(timeout)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def metrics(self):
+        """Queue depth, counters and p50/p95 latency (ms) over the last 1000 requests."""
+        with self._lock:
+            pending = self._pending
+            latencies = np.array(self._latencies) * 1000
+            service = np.array(self._service_times) * 1000
+            counts = dict(self._counts)
+
+        def pct(values, q):
+            return round(float(np.percentile(values, q)), 1) if len(values) else 0.0
+
+        return {
+            "workers": self.workers,
+            "busy": min(pending, self.workers),
+            "queue_depth": max(0, pending - self.workers),
+            **counts,
+            "latency_p50_ms": pct(latencies, 50),
+            "latency_p95_ms": pct(latencies, 95),
+            "service_p50_ms": pct(service, 50),
+        }
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+def benchmark(pool, images, requests, clients):
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as callers:
+        list(callers.map(lambda i: pool.process(images[i % len(images)]), range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the FaceMesh pool on local images.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--clients", type=int, help="concurrent callers (default: 2 x workers)")
+    args = parser.parse_args()
+
+    images = [cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB) for path in args.images]
+    pool = FaceMeshPool(args.workers)
+    try:
+        pool.process(images[0], timeout=120)  # start the workers
+        throughput = benchmark(pool, images, args.requests, args.clients or 2 * pool.workers)
+        print(f"{throughput:.1f} images/s with {pool.workers} worker(s)")
+        print(pool.metrics())
+    finally:
+        pool.close()
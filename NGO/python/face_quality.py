@@ -0,0 +1,65 @@
+"""
+Cheap image-quality gate run on selfies before FaceMesh.
+
+All checks read one strided sample of at most MAX_SIDE pixels per side,
+so a 12 MP phone photo costs about as much as a thumbnail and no
+full-size temporaries are allocated. Color spread, saturation and
+intensity statistics are computed together in signed/float arithmetic,
+so channel differences cannot wrap around as they do in uint8.
+"""
+
+import math
+
+import numpy as np
+
+MAX_SIDE = 256
+
+# Rejection thresholds (same meaning as the original per-check functions).
+# The original color score wrapped around in uint8 and read 2-20x higher;
+# 4 on the corrected score keeps the NGO/ sample photos' pass/fail unchanged.
+COLOR_THRESHOLD = 4         # mean |R-G|, |R-B|, |G-B| on 0..255
+SATURATION_THRESHOLD = 25   # mean HSV saturation on 0..255
+NEGATIVE_MEAN = 170         # bright ...
+NEGATIVE_STD = 60           # ... but flat: looks like an inverted photo
+
+# ITU-R BT.601 luma weights, as used by cv2.COLOR_RGB2GRAY
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def sample(image, max_side=MAX_SIDE):
+    """Strided view of image with both sides <= max_side (no copy)."""
+    step = max(1, math.ceil(max(image.shape[:2]) / max_side))
+    return image[::step, ::step]
+
+
+def image_stats(image, max_side=MAX_SIDE):
+    """Color spread, mean saturation and intensity mean/std of an RGB image."""
+    px = sample(image, max_side).reshape(-1, 3).astype(np.float32)
+
+    spread = np.abs(px[:, [0, 0, 1]] - px[:, [1, 2, 2]])  # R-G, R-B, G-B
+    high = px.max(axis=1)
+    low = px.min(axis=1)
+    saturation = np.divide(255 * (high - low), high, out=np.zeros_like(high), where=high > 0)
+    gray = px @ LUMA
+
+    return {
+        "color_score": float(spread.mean()),
+        "saturation": float(saturation.mean()),
+        "intensity_mean": float(gray.mean()),
+        "intensity_std": float(gray.std()),
+    }
+
+
+def check_image_quality(image, max_side=MAX_SIDE):
+    """Return (ok, message, stats) for an RGB uint8 image; stats is None for non-RGB input."""
+    if image.ndim < 3 or image.shape[2] != 3:
+        return False, "Uploaded image is not a color image", None
+
+    stats = image_stats(image, max_side)
+    if stats["color_score"] <= COLOR_THRESHOLD:
+        return False, "Uploaded image is not a color image", stats
+    if stats["saturation"] <= SATURATION_THRESHOLD:
+        return False, "Image has very low color information", stats
+    if stats["intensity_mean"] > NEGATIVE_MEAN and stats["intensity_std"] < NEGATIVE_STD:
+        return False, "Uploaded image is not a color image", stats
+    return True, "Image quality OK", stats
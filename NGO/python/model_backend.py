@@ -0,0 +1,67 @@
+"""
+Inference backend selection for the Aadhaar YOLO models.
+
+    pytorch    models/<name>.pt          (default)
+    onnx       models/<name>.onnx        exported by export_onnx.py
+    onnx-int8  models/<name>_int8.onnx   dynamically quantized copy
+
+ultralytics runs .onnx weights through onnxruntime, so callers keep the
+same YOLO result objects whichever backend is picked. The backend comes
+from the argument or the AADHAR_BACKEND environment variable.
+"""
+
+import ast
+import os
+from pathlib import Path
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+
+# Model name -> ultralytics task (see models/model_list.txt)
+MODELS = {
+    "aadhar_classifier": "classify",
+    "model": "detect",
+}
+
+SUFFIXES = {
+    "pytorch": ".pt",
+    "onnx": ".onnx",
+    "onnx-int8": "_int8.onnx",
+}
+
+
+def default_backend():
+    backend = os.getenv("AADHAR_BACKEND", "pytorch")
+    if backend not in SUFFIXES:
+        raise ValueError(f"AADHAR_BACKEND must be one of {', '.join(SUFFIXES)}, got {backend!r}")
+    return backend
+
+
+def model_path(name, backend=None):
+    return MODELS_DIR / f"{name}{SUFFIXES[backend or default_backend()]}"
+
+
+def onnx_imgsz(path):
+    """Training image size stored in the ultralytics ONNX metadata."""
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    imgsz = session.get_modelmeta().custom_metadata_map.get("imgsz")
+    return ast.literal_eval(imgsz) if imgsz else None
+
+
+def load_yolo(name, backend=None):
+    """Load a model from models/ with the chosen backend."""
+    from ultralytics import YOLO
+
+    path = model_path(name, backend)
+    if not path.exists():
+        hint = " (run export_onnx.py first)" if path.suffix == ".onnx" else ""
+        raise FileNotFoundError(f"{path} not found{hint}")
+    model = YOLO(str(path), task=MODELS[name])
+    if path.suffix == ".onnx":
+        # Dynamic-shape exports would otherwise be run at the predictor default (640),
+        # not the size the .pt checkpoint carries
+        imgsz = onnx_imgsz(path)
+        if imgsz:
+            model.overrides["imgsz"] = imgsz
+    return model
@@ -0,0 +1,61 @@
+"""
+Pass/fail of the selfie quality gate on the sample images in NGO/.
+
+The expected outcomes are those of the original per-check functions, so a
+change to a metric or threshold cannot quietly flip a sample.
+
+    python -m unittest test_face_quality        # from NGO/python/
+"""
+
+import unittest
+from pathlib import Path
+
+import cv2
+
+from face_quality import check_image_quality
+
+SAMPLES_DIR = Path(__file__).resolve().parent.parent
+
+# file -> (ok, message)
+EXPECTED = {
+    "home_2.jpg": (True, "Image quality OK"),
+    "img1.JPEG": (True, "Image quality OK"),
+    "img2.jpg": (True, "Image quality OK"),
+    "img3.jpeg": (True, "Image quality OK"),
+    "OIP.jpg": (False, "Image has very low color information"),
+    "img4.jpg": (False, "Image has very low color information"),
+    # Bright and flat: caught by the negative-image check
+    "97160e0a758e4ee6348d3da924fb21cf.jpg": (False, "Uploaded image is not a color image"),
+    "Sample_Passport.jpg": (False, "Uploaded image is not a color image"),
+}
+
+
+def load_rgb(name):
+    image = cv2.imread(str(SAMPLES_DIR / name))
+    if image is None:
+        raise FileNotFoundError(SAMPLES_DIR / name)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+class SampleImagesTest(unittest.TestCase):
+    def test_samples(self):
+        for name, expected in EXPECTED.items():
+            with self.subTest(name):
+                ok, message, _ = check_image_quality(load_rgb(name))
+                self.assertEqual((ok, message), expected)
+
+    def test_grayscale_copies_are_rejected(self):
+        for name, (ok, _) in EXPECTED.items():
+            if not ok:
+                continue
+            with self.subTest(name):
+                gray = cv2.cvtColor(cv2.cvtColor(load_rgb(name), cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB)
+                self.assertEqual(check_image_quality(gray)[:2], (False, "Uploaded image is not a color image"))
+
+    def test_single_channel_is_rejected(self):
+        gray = cv2.cvtColor(load_rgb("img1.JPEG"), cv2.COLOR_RGB2GRAY)
+        self.assertEqual(check_image_quality(gray), (False, "Uploaded image is not a color image", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
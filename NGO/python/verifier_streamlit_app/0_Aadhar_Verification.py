@@ -1,12 +1,12 @@
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
 
+from resources import get_classifier, start_prewarm
+
 st.set_page_config(page_title="Aadhaar Verification", page_icon="🪪")
 
-# Load model only once for performance
-if "model" not in st.session_state:
-    st.session_state.model = YOLO("../models/aadhar_classifier.pt")
+# Load the models in the background while the first user is still uploading
+start_prewarm()
 
 # Persist state
 if "verified_aadhar" not in st.session_state:
@@ -26,14 +26,11 @@ else:
         image = Image.open(uploaded)
         st.image(image, caption="Uploaded Image", use_container_width=True)
 
-        results = st.session_state.model(image)
-        pred = results[0].probs
-        cls_id = pred.top1
-        conf = pred.top1conf
-        class_name = st.session_state.model.names[cls_id]
+        class_name, conf = get_classifier().classify(image)
 
         if class_name.lower() == "aadhar":
             st.session_state.verified_aadhar = True  # Persist!
+            st.session_state.aadhar_image = uploaded.getvalue()  # card photo for the selfie face match
             st.success(f"Aadhaar detected ({conf:.2f})")
             
             # Continue button becomes ACTIVE only now
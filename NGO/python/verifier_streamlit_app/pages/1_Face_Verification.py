@@ -1,138 +1,69 @@
+import sys
+import uuid
+from pathlib import Path
+
+import requests
 import streamlit as st
 import cv2
-import mediapipe as mp
 from PIL import Image
 import numpy as np
 
-mp_face_mesh = mp.solutions.face_mesh
-
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=True,
-    max_num_faces=2,
-    refine_landmarks=True,
-    min_detection_confidence=0.5
-)
-
-# Function to detect grayscale images
-def is_color_image(image, threshold=10):
-    if len(image.shape) < 3 or image.shape[2] != 3:
-        return False  # True grayscale image
-
-    R, G, B = cv2.split(image)
-
-    diff_rg = np.mean(np.abs(R - G))
-    diff_rb = np.mean(np.abs(R - B))
-    diff_gb = np.mean(np.abs(G - B))
-
-    color_score = (diff_rg + diff_rb + diff_gb) / 3
-
-    return color_score > threshold
-
-# Function to detect less saturated images
-def has_enough_saturation(image, sat_threshold=25):
-    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-    saturation = hsv[:, :, 1]
-    mean_sat = np.mean(saturation)
-
-    return mean_sat > sat_threshold
-
-#Function to detect negative images
-def is_negative_image(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-
-    mean_intensity = np.mean(gray)
-    std_intensity = np.std(gray)
-
-    # Negative images usually have high brightness but abnormal contrast
-    if mean_intensity > 170 and std_intensity < 60:
-        return True
-
-    return False
+# Process-wide model handles (resources.py also puts NGO/python on the path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from resources import get_face_index, get_face_mesh_pool, start_prewarm
+from face_geometry import evaluate as evaluate_face_geometry
+from face_match import match_enrollment
+from face_quality import check_image_quality
+
+# 1:1 match against the Aadhaar photo + 1:N duplicate check; a check that cannot run is a failed match
+def match_with_aadhar(selfie):
+    card = st.session_state.get("aadhar_image")
+    if card is None:
+        return {"match": False, "duplicates": [],
+                "reason": " Aadhaar photo not found. Please verify your Aadhaar card again."}
+    registrant_id = st.session_state.setdefault("registrant_id", uuid.uuid4().hex)
+    try:
+        return match_enrollment(card, cv2.cvtColor(selfie, cv2.COLOR_RGB2BGR), get_face_index(), registrant_id)
+    except requests.RequestException:
+        return {"match": False, "duplicates": [],
+                "reason": " Face match service unavailable, so the photo could not be verified. Please try again later."}
 
 # Function for validating images
 def validate_selfie_face(image):
     print(f"Image shape: {image.shape}")
     h, w, _ = image.shape
-    img_area = h * w
     
-    if not is_color_image(image):
-        return False, "Uploaded image is not a color image", None
-    
-    if not has_enough_saturation(image):
-        return False, "Image has very low color information", None
-    
-    if is_negative_image(image):
-        return False, "Uploaded image is not a color image", None
+    # Reject grayscale / washed-out / negative images before running FaceMesh
+    ok, message, _ = check_image_quality(image)
+    if not ok:
+        return False, message, None
 
     rgb = image
     # cv2.imwrite("uploaded_img.jpg",rgb)
-    results = face_mesh.process(rgb)
+    faces = get_face_mesh_pool().process(rgb)
 
     # 1. Exactly ONE face
-    if not results.multi_face_landmarks:
+    if not faces:
         return False, "No face detected", None
 
-    if len(results.multi_face_landmarks) != 1:
+    if len(faces) != 1:
         return False, "Multiple faces detected", None
 
-    landmarks = results.multi_face_landmarks[0]
-
-    # Convert normalized landmarks to pixel coordinates
-    xs = [int(pt.x * w) for pt in landmarks.landmark]
-    ys = [int(pt.y * h) for pt in landmarks.landmark]
-
-    min_x, max_x = max(0, min(xs)), min(w, max(xs))
-    min_y, max_y = max(0, min(ys)), min(w, max(ys))
-
-    face_w = max_x - min_x
-    face_h = max_y - min_y
-    face_area = face_w * face_h
-
-    # 2. Face size check (ONLY FACE condition)
-    face_ratio = face_area / img_area
-    print(f"(Face / Image) area ratio: {face_ratio}")
-    if face_ratio < 0.15:   # VERY important threshold
-        return False, "Face too small / background too dominant", None
-
-    # 3. Centered face check
-    face_cx = (min_x + max_x) / 2
-    face_cy = (min_y + max_y) / 2
-    img_cx, img_cy = w / 2, h / 2
-
-    dx = abs(face_cx - img_cx) / w
-    dy = abs(face_cy - img_cy) / h
-
-    if dx > 0.15 or dy > 0.15:
-        return False, "Face not centered", None
-
-    # 4. Aspect ratio check (reject full body shots)
-    aspect_ratio = face_h / face_w
-    print(f"Face aspect ratio: {aspect_ratio}")
-    if aspect_ratio < 1.05 or aspect_ratio > 1.7:
-        return False, "Invalid aspect ratio", None
-
-    # 5. FRONTAL FACE CHECK (Pose Validation)
-    LEFT_EYE = 33
-    RIGHT_EYE = 263
-    NOSE = 1
-
-    lx, ly = xs[LEFT_EYE], ys[LEFT_EYE]
-    rx, ry = xs[RIGHT_EYE], ys[RIGHT_EYE]
-    nx, ny = xs[NOSE], ys[NOSE]
-
-    # Eye level alignment
-    if abs(ly - ry) > face_h * 0.05:
-        return False, "Head tilted", None
+    landmarks = faces[0]
 
-    # Nose centered between eyes
-    if abs(nx - (lx + rx) / 2) > face_w * 0.07:
-        return False, "Face not frontal", None
+    # 2-5. Size, centering, aspect ratio and frontal pose checks
+    ok, message, bbox, score, measures = evaluate_face_geometry(landmarks, w, h)
+    print(f"(Face / Image) area ratio: {measures['face_ratio']:.3f}, "
+          f"aspect ratio: {measures['aspect']:.2f}, quality score: {score:.2f}")
+    if not ok:
+        return False, message, None
 
-    return True, "Valid face image", (min_x, min_y, max_x, max_y)
+    return True, message, bbox
 
 
 #Streamlit part
 st.set_page_config(page_title="Face Verification")
+start_prewarm()
 
 st.title("Photo Upload and Verification")
 
@@ -184,9 +115,17 @@ else:
             if not is_valid:
                 st.error(message)
             else:
-                st.session_state.verified_face = True
-                st.success("Photo uploaded successfully.")
+                match = match_with_aadhar(img)
+                if match.get("duplicates"):
+                    st.error(" This face is already enrolled under another registration.")
+                elif not match["match"]:
+                    st.error(match.get("reason", " The photo does not match the face on the Aadhaar card."))
+                else:
+                    st.session_state.verified_face = True
+                    st.success("Photo uploaded successfully.")
                 
+        except TimeoutError:
+            st.error(" Face verification is busy right now. Please try again in a moment.")
         except Exception as e:
             st.error(" Something went wrong processing the image.")
             st.write(e)
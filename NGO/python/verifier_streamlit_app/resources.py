@@ -0,0 +1,127 @@
+"""
+Process-wide model handles for the verifier app.
+
+Every handle is created lazily on first use and then shared by all
+sessions through st.cache_resource. When the server starts, the first page
+run also starts a background thread that loads them ahead of the first
+upload (disable with VERIFIER_PREWARM=0).
+
+Each load is reported on stdout and appended to logs/startup.jsonl with
+its duration, what triggered it (prewarm or a request), and the seconds
+since the first page run, so cold-start regressions show up over time.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import streamlit as st
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Shared modules live in NGO/python
+sys.path.insert(0, str(APP_DIR.parent))
+
+STARTUP_LOG = APP_DIR / "logs" / "startup.jsonl"
+PREWARM = os.getenv("VERIFIER_PREWARM", "1") != "0"
+PREWARM_THREAD = "verifier-prewarm"
+
+_origin = time.perf_counter()
+_log_lock = threading.Lock()
+
+
+def report(event, seconds):
+    trigger = "prewarm" if threading.current_thread().name == PREWARM_THREAD else "request"
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "pid": os.getpid(),
+        "event": event,
+        "seconds": round(seconds, 3),
+        "trigger": trigger,
+        "since_first_run": round(time.perf_counter() - _origin, 3),
+    }
+    print(f"[startup] {event} ready in {seconds:.2f}s ({trigger}, "
+          f"{record['since_first_run']:.2f}s after first page run)")
+    with _log_lock:
+        STARTUP_LOG.parent.mkdir(exist_ok=True)
+        with open(STARTUP_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def timed(event):
+    def decorator(load):
+        @functools.wraps(load)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            value = load(*args, **kwargs)
+            report(event, time.perf_counter() - started)
+            return value
+        return wrapper
+    return decorator
+
+
+# Aadhaar classifier: one model for the whole server process, micro-batched across sessions
+@st.cache_resource
+@timed("classifier")
+def get_classifier():
+    from PIL import Image
+    from classifier_service import ClassifierService
+
+    service = ClassifierService()
+    service.predict([Image.new("RGB", (64, 64))])  # the first forward pass fuses and builds the model
+    return service
+
+
+# FaceMesh worker processes; MediaPipe is only imported inside the workers
+@st.cache_resource
+@timed("face_mesh_pool")
+def get_face_mesh_pool():
+    from face_mesh_pool import FaceMeshPool
+
+    return FaceMeshPool(
+        static_image_mode=True,
+        max_num_faces=2,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
+
+
+# Enrolled selfie embeddings for the duplicate check
+@st.cache_resource
+@timed("face_index")
+def get_face_index():
+    from face_match import FaceIndex
+
+    return FaceIndex()
+
+
+@timed("prewarm_total")
+def prewarm():
+    get_classifier()
+    timed("face_mesh_workers")(get_face_mesh_pool().prewarm)()
+    get_face_index()
+
+
+@st.cache_resource
+def start_prewarm():
+    """Start the background prewarm once per server process."""
+    if not PREWARM:
+        return None
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+    def run():
+        try:
+            prewarm()
+        except Exception as e:
+            # Models are loaded again on demand; just record why prewarming failed
+            print(f"[startup] prewarm failed: {e!r}")
+
+    thread = threading.Thread(target=run, name=PREWARM_THREAD, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+    return thread
@@ -2,24 +2,431 @@
 """
 Download content from URLs in a JSON file.
 Saves content organized by entry name with retry logic and error handling.
+Re-runs are incremental: a manifest in the output directory remembers what
+was fetched, unchanged files are revalidated with conditional GETs and
+interrupted downloads are resumed with HTTP Range requests.
+Bodies are streamed to disk in fixed-size chunks and stored once under
+``.blobs/`` by SHA-256; entry folders hold hardlinks to those blobs.
+URLs are grouped by canonical form (no tracking parameters, normalized
+host, redirects remembered in ``redirects.jsonl``), so a document listed
+by many plans is fetched once per run and linked into each of them.
+Transient failures are retried with jittered exponential backoff (or the
+server's Retry-After); a host that keeps failing is skipped for a while by
+a circuit breaker, and whatever still fails lands in ``retry_queue.json``
+for ``--retry-failed``.
 """
 
+import argparse
+import hashlib
+import http.client
 import json
+import mimetypes
 import os
+import random
+import re
+import shutil
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from urllib.parse import urlparse
-from urllib.request import Request, urlopen
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlparse, urlunparse
 from urllib.error import URLError, HTTPError
 
 
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Statuses worth retrying; any other error status is final for that URL
+RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+CHUNK_SIZE = 64 * 1024
+# Analytics parameters search results append to carrier links (Cigna's _gl, Google's gclid, ...)
+TRACKING_PARAMS = {"_gl", "_ga", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid",
+                   "mc_cid", "mc_eid", "_hsenc", "_hsmi", "srsltid"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+CONTENT_TYPE_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "text/html": ".html",
+    "application/msword": ".doc",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+}
+
+
+def file_sha256(path, digest=None):
+    """Hash a file in chunks, optionally feeding an existing hash object."""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def canonical_url(url):
+    """Comparable form of a URL for deduplication.
+    
+    Lower-case host without ``www.`` or a default port, no fragment, no
+    tracking parameters, and one percent-encoding of the path.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host if parsed.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parsed.port}"
+    path = quote(unquote(parsed.path or "/"), safe="/:@!$&'()*+,;=~")
+    query = urlencode([(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                       if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)])
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
+
+def response_filename(url, content_disposition=None, content_type=None):
+    """File name for a download.
+    
+    The Content-Disposition name wins; otherwise the URL's last path
+    segment, with its extension replaced by the content type's when they
+    disagree (``.ashx`` handlers and extensionless links that serve PDFs).
+    """
+    ctype = (content_type or "").split(";")[0].strip().lower()
+    ext = CONTENT_TYPE_EXTENSIONS.get(ctype)
+    if ext is None and ctype and ctype != "application/octet-stream":
+        ext = mimetypes.guess_extension(ctype)
+    
+    name = None
+    if content_disposition:
+        header = Message()
+        header["Content-Disposition"] = content_disposition
+        name = header.get_filename()
+    if name:
+        name = os.path.basename(name.replace("\\", "/"))
+    else:
+        name = os.path.basename(unquote(urlparse(url).path))
+        stem, dot, suffix = name.rpartition(".")
+        has_ext = dot and stem and suffix.isalnum() and len(suffix) <= 5
+        if ext and (not has_ext or f".{suffix.lower()}" != ext):
+            name = (stem if has_ext else name) + ext
+    
+    name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", name).strip(" .")
+    return name or f"document{ext or ''}"
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0, retry_after=None):
+    """Seconds to sleep before retry number attempt (1-based).
+    
+    "Full jitter" exponential backoff, uniform in [0, min(cap, base * 2^(attempt-1))],
+    so workers hitting the same host do not retry in lockstep. A server's
+    Retry-After wins when it sent one.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def link_or_copy(src, dst):
+    """Point dst at src with a hardlink, copying where links are unsupported."""
+    if dst.exists() and os.path.samefile(src, dst):
+        # Already linked; renaming a second link of the same inode over it would be a no-op
+        return
+    tmp_path = dst.with_name(dst.name + ".link")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class DownloadManifest:
+    """Append-only JSON-lines record of downloads in an output directory.
+    
+    Each line describes one (entry, url): the saved path relative to the
+    output directory, the validators (ETag / Last-Modified) and the size and
+    SHA-256 of the content. Later lines win; a ``partial`` record marks a
+    download that was interrupted and can be resumed.
+    """
+    
+    FILENAME = "manifest.jsonl"
+    
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / self.FILENAME
+        self.records = {}
+        # (entry, sha256) -> path of a complete download, to reuse when another URL gives the same blob
+        self.blob_paths = {}
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """Read the manifest; a truncated last line (crash mid-write) is ignored."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.records[(record["entry"], record["url"])] = record
+                self._index(record)
+    
+    def _index(self, record):
+        if record.get("sha256") and record.get("path") and not record.get("partial"):
+            self.blob_paths[(record["entry"], record["sha256"])] = record["path"]
+    
+    def get(self, entry, url):
+        return self.records.get((entry, url))
+    
+    def record(self, entry, url, **fields):
+        """Store and append a record for (entry, url)."""
+        record = {"entry": entry, "url": url, **fields}
+        with self._lock:
+            self.records[(entry, url)] = record
+            self._index(record)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+    
+    def compact(self):
+        """Rewrite the manifest with only the latest record per (entry, url)."""
+        with self._lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self.records.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+
+class RedirectCache:
+    """Append-only JSON-lines map of canonical URL -> the URL it last redirected to.
+    
+    Later lines win; a null target forgets an entry. Cached targets are
+    fetched directly on the next run, and URLs that redirect to the same
+    place are grouped into one download before any request is made.
+    """
+    
+    FILENAME = "redirects.jsonl"
+    
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / self.FILENAME
+        self.targets = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get("final_url"):
+                        self.targets[record["url"]] = record["final_url"]
+                    else:
+                        self.targets.pop(record["url"], None)
+    
+    def resolve(self, url):
+        """Where url redirected to last time, or url itself."""
+        return self.targets.get(canonical_url(url), url)
+    
+    def record(self, url, final_url):
+        """Remember that url ended up at final_url (None or url itself forgets it)."""
+        key = canonical_url(url)
+        if final_url and canonical_url(final_url) == key:
+            final_url = None
+        with self._lock:
+            if self.targets.get(key) == final_url:
+                return
+            if final_url:
+                self.targets[key] = final_url
+            else:
+                self.targets.pop(key)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"url": key, "final_url": final_url}, ensure_ascii=False) + "\n")
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+    
+    After ``threshold`` consecutive transient failures a host is open and
+    requests to it fail fast for ``cooldown`` seconds, doubling each time
+    it re-opens up to ``max_cooldown``. Once the cooldown is over a single
+    request is let through (half-open); its outcome closes the circuit or
+    opens it again.
+    """
+    
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=600.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.hosts = {}
+        self._lock = threading.Lock()
+    
+    def _host(self, host):
+        return self.hosts.setdefault(host, {"failures": 0, "trips": 0, "open_until": 0.0, "probing": False})
+    
+    def allow(self, host):
+        """Whether a request to host may go out now."""
+        with self._lock:
+            state = self._host(host)
+            if not state["trips"]:
+                return True
+            if state["probing"] or self.clock() < state["open_until"]:
+                return False
+            state["probing"] = True
+            return True
+    
+    def success(self, host):
+        with self._lock:
+            self.hosts[host] = {"failures": 0, "trips": 0, "open_until": 0.0, "probing": False}
+    
+    def failure(self, host, open_for=None):
+        """Count a transient failure; open_for forces the circuit open (e.g. a long Retry-After)."""
+        with self._lock:
+            state = self._host(host)
+            state["failures"] += 1
+            if not (state["probing"] or open_for or state["failures"] >= self.threshold):
+                return
+            state["trips"] += 1
+            cooldown = open_for or min(self.max_cooldown, self.cooldown * 2 ** (state["trips"] - 1))
+            state["open_until"] = self.clock() + cooldown
+            state["failures"] = 0
+            state["probing"] = False
+        print(f"  ⛔ {host}: circuit open for {cooldown:.0f}s")
+    
+    def release(self, host):
+        """End a half-open probe that failed for reasons unrelated to the host."""
+        with self._lock:
+            state = self.hosts.get(host)
+            if state:
+                state["probing"] = False
+    
+    def reopens_in(self, host):
+        """Seconds until host accepts a probe again (0 if it is not open)."""
+        with self._lock:
+            state = self.hosts.get(host)
+            return max(0.0, state["open_until"] - self.clock()) if state and state["trips"] else 0.0
+
+
+class RetryQueue:
+    """URLs that failed in recent runs, rewritten at the end of every run.
+    
+    ``retry_queue.json`` maps entry -> {url: {"error", "permanent",
+    "failures", "failed_at"}}. A URL leaves the queue once it downloads;
+    permanent failures (404, 410, ...) stay listed but are not retried by
+    ``--retry-failed``.
+    """
+    
+    FILENAME = "retry_queue.json"
+    
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / self.FILENAME
+        self.entries = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except json.JSONDecodeError:
+                pass
+    
+    def __len__(self):
+        return sum(len(urls) for urls in self.entries.values())
+    
+    def fail(self, entry, url, error, permanent=False):
+        with self._lock:
+            previous = self.entries.get(entry, {}).get(url, {})
+            self.entries.setdefault(entry, {})[url] = {
+                "error": error,
+                "permanent": permanent,
+                "failures": previous.get("failures", 0) + 1,
+                "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+    
+    def succeed(self, entry, url):
+        with self._lock:
+            urls = self.entries.get(entry, {})
+            if urls.pop(url, None) is not None and not urls:
+                del self.entries[entry]
+    
+    def doc_links(self, include_permanent=False):
+        """Queued URLs in doc_links.json form."""
+        return {entry: [url for url, info in urls.items() if include_permanent or not info["permanent"]]
+                for entry, urls in self.entries.items()}
+    
+    def save(self):
+        with self._lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections, one per (scheme, host) per worker thread."""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _connections(self):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def get(self, scheme, netloc):
+        """Return this thread's connection to the host, opening one if needed."""
+        conns = self._connections()
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def discard(self, scheme, netloc):
+        """Drop this thread's connection to the host (e.g. after an error)."""
+        conn = self._connections().pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close_all(self):
+        """Close every connection opened by any thread."""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
 class URLDownloader:
-    def __init__(self, json_file, output_dir="pdf_file_downloads", max_retries=3, timeout=10):
+    def __init__(self, json_file, output_dir="pdf_file_downloads", max_retries=3, timeout=10,
+                 workers=1, per_host=2, backoff_base=1.0, backoff_cap=30.0, max_retry_after=120.0,
+                 breaker_threshold=5, breaker_cooldown=30.0):
         self.json_file = json_file
         self.output_dir = Path(output_dir)
         self.max_retries = max_retries
         self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Longest Retry-After (or circuit cooldown) worth waiting for inside a run
+        self.max_retry_after = max_retry_after
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
         self.output_dir.mkdir(exist_ok=True)
         
         self.stats = {
@@ -27,7 +434,39 @@ class URLDownloader:
             "successful": 0,
             "failed": 0,
             "skipped": 0,
+            "unchanged": 0,
+            "deduplicated": 0,
+            "shared": 0,
         }
+
+        self.manifest = DownloadManifest(self.output_dir)
+        self.redirects = RedirectCache(self.output_dir)
+        self.retry_queue = RetryQueue(self.output_dir)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._deferred = []
+        self.elapsed = 0.0
+        self.pool = ConnectionPool(timeout)
+        self._stats_lock = threading.Lock()
+        self._host_lock = threading.Lock()
+        self._host_slots = {}
+        self._path_lock = threading.Lock()
+        self._reserved = set()
+        # canonical final URL -> (blob, manifest fields, file name) of documents fetched this run
+        self._fetched = {}
+    
+    def count(self, key):
+        """Increment a stats counter (safe to call from worker threads)."""
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def host_slot(self, url):
+        """Semaphore limiting concurrent requests to the URL's host."""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
     
     def load_json(self):
         """Load URLs from JSON file."""
@@ -38,58 +477,323 @@ class URLDownloader:
             print(f"Error loading JSON file: {e}")
             sys.exit(1)
     
-    def get_filename_from_url(self, url):
-        """Extract filename from URL, or generate one."""
-        try:
+    def unique_path(self, entry_name, filename):
+        """Reserve a free path for filename in the entry's folder, adding _1, _2... if taken."""
+        entry_dir = self.output_dir / entry_name
+        entry_dir.mkdir(exist_ok=True)
+        with self._path_lock:
+            save_path = entry_dir / filename
+            counter = 1
+            while save_path.exists() or save_path in self._reserved:
+                name, ext = filename.rsplit('.', 1) if '.' in filename else (filename, '')
+                new_name = f"{name}_{counter}.{ext}" if ext else f"{filename}_{counter}"
+                save_path = entry_dir / new_name
+                counter += 1
+            self._reserved.add(save_path)
+        return save_path
+    
+    def target_path(self, entry_name, url, filename, blob=None, sha256=None):
+        """Saved path of (entry, url): from the manifest, the entry's copy of the same blob, or a new one."""
+        record = self.manifest.get(entry_name, url)
+        if record and record.get("path"):
+            return self.output_dir / record["path"]
+        known = self.manifest.blob_paths.get((entry_name, sha256))
+        if known:
+            path = self.output_dir / known
+            # Still that document: a link to the blob (or, where links are unsupported, a copy of it)
+            if path.exists() and (os.path.samefile(blob, path) or path.stat().st_size == blob.stat().st_size):
+                return path
+        return self.unique_path(entry_name, filename)
+    
+    def link_targets(self, targets, blob, fields, filename, fresh=False):
+        """Link a document into every (entry, url) that lists it and record each in the manifest.
+        
+        An entry that lists the same document under several URLs gets one file.
+        """
+        paths = {}
+        for entry_name, url in targets:
+            save_path = paths.get(entry_name)
+            if save_path is None:
+                save_path = paths[entry_name] = self.target_path(entry_name, url, filename,
+                                                                 blob, fields.get("sha256"))
+                if fresh or not save_path.exists():
+                    link_or_copy(blob, save_path)
+            record = {"path": save_path.relative_to(self.output_dir).as_posix(), **fields}
+            if self.manifest.get(entry_name, url) != {"entry": entry_name, "url": url, **record}:
+                self.manifest.record(entry_name, url, **record)
+    
+    def send(self, parsed, headers):
+        """Send a GET over a pooled connection, retrying once if a kept-alive socket went stale."""
+        path = quote(parsed.path or "/", safe="/%:@!$&'()*+,;=~")
+        if parsed.query:
+            path += "?" + parsed.query
+        
+        for _ in range(2):
+            conn = self.pool.get(parsed.scheme, parsed.netloc)
+            reused = conn.sock is not None
+            try:
+                conn.request("GET", path, headers=headers)
+                return conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                self.pool.discard(parsed.scheme, parsed.netloc)
+                if not reused:
+                    raise URLError(e)
+        raise URLError("connection reset")
+    
+    def open_url(self, url, headers, max_redirects=5):
+        """Open URL following redirects; return (response, final_url) or raise HTTPError/URLError."""
+        for _ in range(max_redirects + 1):
             parsed = urlparse(url)
-            filename = os.path.basename(parsed.path)
-            if filename and '.' in filename:
-                return filename
-        except:
-            pass
-        return None
+            response = self.send(parsed, headers)
+            location = response.getheader("Location")
+            if response.status in REDIRECT_CODES and location:
+                response.read()
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                response.read()
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+            return response, url
+        raise URLError(f"too many redirects: {url}")
+    
+    def blob_path(self, sha256):
+        """Location of a content-addressed blob: .blobs/ab/abcdef..."""
+        return self.output_dir / ".blobs" / sha256[:2] / sha256
+    
+    def store_blob(self, part_path, sha256):
+        """Move a finished download into the blob store; return (blob, already_stored)."""
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            part_path.unlink()
+            return blob, True
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(part_path, blob)
+        return blob, False
+    
+    def prune_blobs(self):
+        """Delete blobs no longer referenced by any manifest record."""
+        blob_root = self.output_dir / ".blobs"
+        if not blob_root.exists():
+            return
+        referenced = {r.get("sha256") for r in self.manifest.records.values()}
+        for blob in blob_root.glob("*/*"):
+            if blob.name not in referenced:
+                blob.unlink()
+    
+    def fetch(self, targets, headers):
+        """Fetch one document for all of its (entry, url) targets.
+        
+        Returns "successful", "unchanged" (HTTP 304) or "shared" (another
+        URL fetched this run redirected to the same document).
+        
+        The first target drives the request: a complete earlier copy is
+        revalidated with If-None-Match / If-Modified-Since, and a cached
+        redirect target is requested directly. Bytes are streamed into
+        ``<name>.part`` and hashed on the way, so memory stays flat and an
+        interrupted transfer can be resumed with a Range request next time.
+        The finished file goes into the blob store and every target's path
+        becomes a link to it.
+        """
+        headers = dict(headers)
+        entry_name, url = targets[0]
+        record = self.manifest.get(entry_name, url) or {}
+        save_path = self.output_dir / record["path"] if record.get("path") else None
+        part_path = save_path.with_name(save_path.name + ".part") if save_path else None
+        offset = part_path.stat().st_size if part_path and part_path.exists() else 0
+        known_blob = self.blob_path(record["sha256"]) if record.get("sha256") else None
+        
+        if offset and record.get("partial"):
+            headers["Range"] = f"bytes={offset}-"
+            validator = record.get("etag") or record.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+        elif known_blob and not record.get("partial") and (save_path.exists() or known_blob.exists()):
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        
+        def open_resolved(headers):
+            target = self.redirects.resolve(url)
+            try:
+                return self.open_url(target, headers)
+            except HTTPError as e:
+                if target == url or e.code not in (404, 410):
+                    raise
+                # The remembered redirect target moved; start from the listed URL again
+                self.redirects.record(url, None)
+                return self.open_url(url, headers)
+        
+        try:
+            response, final_url = open_resolved(headers)
+        except HTTPError as e:
+            if e.code != 416 or "Range" not in headers:
+                raise
+            # The partial file no longer matches the remote one; start over.
+            part_path.unlink()
+            del headers["Range"]
+            headers.pop("If-Range", None)
+            response, final_url = open_resolved(headers)
+        self.redirects.record(url, final_url)
+        
+        if response.status == 304:
+            response.read()
+            source = known_blob if known_blob.exists() else save_path
+            fields = {k: v for k, v in record.items() if k not in ("entry", "url", "path")}
+            self.link_targets(targets, source, fields, save_path.name)
+            return "unchanged"
+        
+        doc_key = canonical_url(final_url)
+        shared = self._fetched.get(doc_key)
+        if shared:
+            # Drop the unread body rather than download the document twice
+            parsed = urlparse(final_url)
+            self.pool.discard(parsed.scheme, parsed.netloc)
+            self.link_targets(targets, *shared, fresh=True)
+            return "shared"
+        
+        resuming = response.status == 206
+        validators = {
+            "etag": response.getheader("ETag"),
+            "last_modified": response.getheader("Last-Modified"),
+        }
+        if save_path is None:
+            filename = response_filename(final_url, response.getheader("Content-Disposition"),
+                                         response.getheader("Content-Type"))
+            save_path = self.unique_path(entry_name, filename)
+            part_path = save_path.with_name(save_path.name + ".part")
+        relative = save_path.relative_to(self.output_dir).as_posix()
+        if not resuming:
+            self.manifest.record(entry_name, url, path=relative, partial=True, **validators)
+        
+        digest = hashlib.sha256()
+        if resuming:
+            file_sha256(part_path, digest)
+        
+        try:
+            with open(part_path, 'ab' if resuming else 'wb') as f:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+            if response.length:
+                # Connection closed before Content-Length bytes arrived.
+                raise http.client.IncompleteRead(b'', response.length)
+        except (http.client.HTTPException, OSError) as e:
+            parsed = urlparse(final_url)
+            self.pool.discard(parsed.scheme, parsed.netloc)
+            raise URLError(e)
+        
+        sha256 = digest.hexdigest()
+        size = part_path.stat().st_size
+        blob, already_stored = self.store_blob(part_path, sha256)
+        if already_stored:
+            self.count("deduplicated")
+        fields = {
+            "size": size,
+            "sha256": sha256,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **validators,
+        }
+        self.link_targets(targets, blob, fields, save_path.name, fresh=True)
+        # Published only once the targets are in the manifest, so a "shared" job finds their paths
+        self._fetched[doc_key] = (blob, fields, save_path.name)
+        return "successful"
     
-    def download_url(self, url, save_path):
-        """Download URL content with retry logic."""
+    def download_url(self, targets, final=False):
+        """Download one document with retries.
+        
+        Returns "successful", "unchanged", "shared", "failed", or "deferred"
+        when the host's circuit is open and this is not the final pass.
+        Transient errors (connection failures, 408/429/5xx) are retried
+        with backoff and count against the host's circuit breaker; other
+        HTTP errors fail at once. Failures go to the retry queue.
+        """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        url = targets[0][1]
+        host = urlparse(url).netloc.lower()
+        slot = self.host_slot(url)
+        error = None
         
         for attempt in range(1, self.max_retries + 1):
+            if not self.wait_for_host(host, final):
+                if not final:
+                    self._deferred.append(targets)
+                    return "deferred"
+                error = f"circuit open for {host}"
+                break
+            
+            retry_after = None
             try:
-                request = Request(url, headers=headers)
-                with urlopen(request, timeout=self.timeout) as response:
-                    content = response.read()
-                    with open(save_path, 'wb') as f:
-                        f.write(content)
+                with slot:
+                    outcome = self.fetch(targets, headers)
+                self.breaker.success(host)
+                if outcome == "unchanged":
+                    print(f"  = Unchanged: {url[:60]}...")
+                elif outcome == "shared":
+                    print(f"  ≡ Already fetched this run: {url[:60]}...")
+                else:
                     print(f"  ✓ Downloaded: {url[:60]}...")
-                    return True
+                return outcome
             except HTTPError as e:
-                if e.code == 404:
-                    print(f"  ✗ 404 Not Found: {url[:60]}...")
-                    return False
-                elif attempt < self.max_retries:
-                    print(f"  ! HTTP {e.code} (retry {attempt}/{self.max_retries}): {url[:60]}...")
-                    time.sleep(1)
-                else:
-                    print(f"  ✗ HTTP {e.code} after retries: {url[:60]}...")
-                    return False
+                if e.code not in RETRYABLE_STATUS:
+                    # The host answered; only this URL is broken
+                    self.breaker.success(host)
+                    print(f"  ✗ HTTP {e.code}: {url[:60]}...")
+                    self.queue_failure(targets, f"HTTP {e.code}", permanent=True)
+                    return "failed"
+                error = f"HTTP {e.code}"
+                retry_after = retry_after_seconds(e.headers.get("Retry-After") if e.headers else None)
             except URLError as e:
-                if attempt < self.max_retries:
-                    print(f"  ! Connection error (retry {attempt}/{self.max_retries}): {e.reason}")
-                    time.sleep(1)
-                else:
-                    print(f"  ✗ Connection failed after retries: {e.reason}")
-                    return False
+                error = f"connection error: {e.reason}"
             except Exception as e:
+                # Not the host's fault (disk full, bad data, ...), but a probe must not stay pending
+                self.breaker.release(host)
                 print(f"  ✗ Unexpected error: {str(e)[:60]}...")
-                return False
+                self.queue_failure(targets, f"{type(e).__name__}: {e}")
+                return "failed"
+            
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # Too long to wait now: keep the host closed for that long and move on
+                self.breaker.failure(host, open_for=retry_after)
+                print(f"  ! {error}, asked to retry in {retry_after:.0f}s: {url[:60]}...")
+                break
+            self.breaker.failure(host)
+            if attempt < self.max_retries:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, retry_after)
+                print(f"  ! {error} (retry {attempt}/{self.max_retries} in {delay:.1f}s): {url[:60]}...")
+                time.sleep(delay)
+        
+        print(f"  ✗ {error}, queued for retry: {url[:60]}...")
+        self.queue_failure(targets, error)
+        return "failed"
+    
+    def wait_for_host(self, host, final=False):
+        """Whether a request to host may go out now (False while its circuit is open).
         
-        return False
+        On the final pass a worker waits for another worker's half-open probe
+        of the host instead of giving up on it, for at most max_retry_after
+        seconds.
+        """
+        deadline = time.monotonic() + self.max_retry_after
+        while not self.breaker.allow(host):
+            if not final or self.breaker.reopens_in(host) > 0 or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
     
-    def download_all(self):
-        """Download all URLs from JSON file."""
-        data = self.load_json()
+    def queue_failure(self, targets, error, permanent=False):
+        for entry_name, url in targets:
+            self.retry_queue.fail(entry_name, url, error, permanent)
+    
+    def download_all(self, data=None):
+        """Download all URLs from the JSON file (or the given {entry: [urls]})."""
+        if data is None:
+            data = self.load_json()
         
         if not data:
             print("No data found in JSON file.")
@@ -97,6 +801,62 @@ class URLDownloader:
         
         print(f"\n📥 Starting downloads to: {self.output_dir.absolute()}\n")
         
+        jobs = self.plan_jobs(data)
+        
+        started = time.perf_counter()
+        try:
+            if self.workers > 1:
+                print(f"⚡ {len(jobs)} download(s), {self.workers} workers, {self.per_host} per host\n")
+            self.run_jobs(jobs)
+            if self._deferred:
+                # Jobs skipped while their host's circuit was open get one more pass,
+                # after a short enough cooldown; the probe request decides for the rest
+                deferred, self._deferred = self._deferred, []
+                hosts = {urlparse(targets[0][1]).netloc.lower() for targets in deferred}
+                wait = min(self.breaker.reopens_in(host) for host in hosts)
+                if wait <= self.max_retry_after:
+                    print(f"\n⏳ {len(deferred)} download(s) waiting {wait:.0f}s for {len(hosts)} host(s) to recover")
+                    time.sleep(wait)
+                self.run_jobs(deferred, final=True)
+        finally:
+            self.pool.close_all()
+            self.manifest.compact()
+            self.prune_blobs()
+            self.retry_queue.save()
+        self.elapsed = time.perf_counter() - started
+        
+        self.print_summary()
+    
+    def run_jobs(self, jobs, final=False):
+        if self.workers == 1:
+            for job in jobs:
+                self.run_job(job, final)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(lambda job: self.run_job(job, final), jobs))
+    
+    def run_job(self, targets, final=False):
+        """Download one planned document and record the outcome for each of its URLs."""
+        outcome = self.download_url(targets, final)
+        if outcome == "deferred":
+            return
+        self.count(outcome)
+        for _ in targets[1:]:
+            self.count("failed" if outcome == "failed" else "shared")
+        if outcome != "failed":
+            for entry_name, url in targets:
+                self.retry_queue.succeed(entry_name, url)
+    
+    def plan_jobs(self, data):
+        """Group the listed URLs by document; return one [(entry, url), ...] list per document.
+        
+        URLs with the same canonical form, or that redirected to the same
+        place last time, are one job: the document is fetched once and
+        linked into every entry that lists it. Targets with a complete copy
+        come first so the job revalidates that copy, then resumable ones.
+        """
+        groups = {}
+        
         for entry_name, urls in data.items():
             if not isinstance(urls, list):
                 continue
@@ -105,13 +865,9 @@ class URLDownloader:
                 print(f"⊘ {entry_name}: (no URLs)")
                 continue
             
-            # Create subdirectory for this entry
-            entry_dir = self.output_dir / entry_name
-            entry_dir.mkdir(exist_ok=True)
-            
             print(f"📦 {entry_name}: {len(urls)} URL(s)")
             
-            for idx, url in enumerate(urls, 1):
+            for idx, url in enumerate(dict.fromkeys(urls), 1):
                 self.stats["total_urls"] += 1
                 
                 if not url or not url.startswith(('http://', 'https://')):
@@ -119,27 +875,22 @@ class URLDownloader:
                     self.stats["skipped"] += 1
                     continue
                 
-                filename = self.get_filename_from_url(url)
-                if not filename:
-                    filename = f"file_{idx}"
-                
-                # Ensure unique filename
-                save_path = entry_dir / filename
-                counter = 1
-                while save_path.exists():
-                    name, ext = filename.rsplit('.', 1) if '.' in filename else (filename, '')
-                    new_name = f"{name}_{counter}.{ext}" if ext else f"{filename}_{counter}"
-                    save_path = entry_dir / new_name
-                    counter += 1
-                
-                if self.download_url(url, save_path):
-                    self.stats["successful"] += 1
-                else:
-                    self.stats["failed"] += 1
-            
-            print()
+                record = self.manifest.get(entry_name, url)
+                if record and record.get("path"):
+                    # Keep known paths out of reach of new file names
+                    self._reserved.add(self.output_dir / record["path"])
+                key = canonical_url(self.redirects.resolve(url))
+                groups.setdefault(key, []).append((entry_name, url))
         
-        self.print_summary()
+        def progress(target):
+            record = self.manifest.get(*target) or {}
+            return 0 if record.get("sha256") and not record.get("partial") else 1 if record else 2
+        
+        jobs = [sorted(targets, key=progress) for targets in groups.values()]
+        listed = sum(map(len, jobs))
+        if listed > len(jobs):
+            print(f"\n≡ {listed} URL(s) point to {len(jobs)} distinct document(s)")
+        return jobs
     
     def print_summary(self):
         """Print download statistics."""
@@ -148,22 +899,42 @@ class URLDownloader:
         print("="*60)
         print(f"Total URLs:     {self.stats['total_urls']}")
         print(f"✓ Successful:   {self.stats['successful']}")
+        print(f"= Unchanged:    {self.stats['unchanged']}")
+        print(f"≡ Deduplicated: {self.stats['deduplicated']}")
+        print(f"⇉ Shared:       {self.stats['shared']}")
         print(f"✗ Failed:       {self.stats['failed']}")
         print(f"⊘ Skipped:      {self.stats['skipped']}")
+        print(f"↻ Retry queue:  {len(self.retry_queue)} ({self.retry_queue.path.name})")
+        print(f"Elapsed:        {self.elapsed:.1f}s")
         print(f"Output folder:  {self.output_dir.absolute()}")
         print("="*60 + "\n")
 
 
 if __name__ == '__main__':
     # Configuration
-    json_file = 'doc_links.json'  # Change if needed
-    output_dir = 'pdf_file_downloads'      # Change if needed
+    parser = argparse.ArgumentParser(description="Download policy documents listed in a JSON file.")
+    parser.add_argument("json_file", nargs="?", default="doc_links.json")
+    parser.add_argument("output_dir", nargs="?", default="pdf_file_downloads")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads overall (1 = sequential)")
+    parser.add_argument("--per-host", type=int, default=2, help="concurrent downloads per carrier host")
+    parser.add_argument("--retries", type=int, default=3, help="attempts per URL for transient errors")
+    parser.add_argument("--backoff", type=float, default=1.0, help="base backoff in seconds (doubles per retry)")
+    parser.add_argument("--breaker-threshold", type=int, default=5,
+                        help="consecutive failures before a host is skipped for a while")
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0, help="seconds a failing host is skipped")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="only download the URLs in the output folder's retry queue")
+    args = parser.parse_args()
+    json_file = args.json_file
+    output_dir = args.output_dir
     
     # Validate JSON file exists
-    if not os.path.exists(json_file):
+    if not args.retry_failed and not os.path.exists(json_file):
         print(f"Error: {json_file} not found in current directory.")
         sys.exit(1)
     
     # Run downloader
-    downloader = URLDownloader(json_file, output_dir)
-    downloader.download_all()
+    downloader = URLDownloader(json_file, output_dir, max_retries=args.retries, workers=args.workers,
+                               per_host=args.per_host, backoff_base=args.backoff,
+                               breaker_threshold=args.breaker_threshold, breaker_cooldown=args.breaker_cooldown)
+    downloader.download_all(downloader.retry_queue.doc_links() if args.retry_failed else None)
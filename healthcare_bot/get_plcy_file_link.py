@@ -1,20 +1,192 @@
-from google_Search import policy_pdf_search
-import os
+"""
+Search policy PDF links for every plan in the poli_nm_parser/*_plans.txt files.
+
+Each unique plan name is searched once (see group_by_plan) and the
+result fanned out to every county listing it. Searches run
+concurrently under a token-bucket rate limit, and every finished plan is
+appended to a checkpoint file with its counties, so an interrupted run
+resumes where it stopped. A plan checkpointed for some counties is searched
+again (normally a cache hit) for the counties it was not saved to yet;
+--fresh starts a new run from an empty checkpoint.
+
+This spends SerpAPI quota: use --counties/--limit to run a small batch and
+--dry-run to see how many searches a run would make.
+"""
+
+import argparse
+import asyncio
+import json
+import time
 from pathlib import Path
 
-# Cross-platform file path
-file_path = Path(__file__).parent / "poli_nm_parser" / "Collin_plans.txt"
+from google_Search import build_params, cached_search, default_cache, normalize_query, save_results
+
+PLANS_DIR = Path(__file__).parent / "poli_nm_parser"
+CHECKPOINT_FILE = Path(__file__).parent / "meta" / "search_checkpoint.jsonl"
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def load_county_plans(plans_dir=PLANS_DIR, counties=None):
+    """Map county -> plan names from <county>_plans.txt files."""
+    county_plans = {}
+    for path in sorted(Path(plans_dir).glob("*_plans.txt")):
+        county = path.name[:-len("_plans.txt")]
+        if counties and county not in counties:
+            continue
+        with open(path, encoding="utf-8") as f:
+            county_plans[county] = [line.strip() for line in f if line.strip()]
+    return county_plans
+
+
+def group_by_plan(county_plans):
+    """Map plan name -> counties listing it, in first-seen order."""
+    counties_by_plan = {}
+    for county, plans in county_plans.items():
+        for plcy_name in plans:
+            counties_by_plan.setdefault(plcy_name, []).append(county)
+    return counties_by_plan
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """(plan name, county) pairs already searched and saved by an earlier run."""
+    done = set()
+    if not Path(path).exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done.update((record["plan"], county) for county in record["counties"])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return done
+
+
+def pending_searches(counties_by_plan, done):
+    """Plan name -> the counties it still has to be saved to."""
+    pending = {}
+    for plcy_name, counties in counties_by_plan.items():
+        missing = [county for county in counties if (plcy_name, county) not in done]
+        if missing:
+            pending[plcy_name] = missing
+    return pending
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+async def run_searches(counties_by_plan, rate=1.0, concurrency=4, checkpoint=CHECKPOINT_FILE,
+                       cache=None, client=None, store=None):
+    """Search every plan in counties_by_plan; return a stats dict including latencies."""
+    cache = cache or default_cache()
+    bucket = TokenBucket(rate, burst=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    Path(checkpoint).parent.mkdir(parents=True, exist_ok=True)
+    stats = {"done": 0, "failed": 0, "api_calls": 0, "cache_hits": 0, "latencies": [], "failed_plans": []}
+
+    with open(checkpoint, "a", encoding="utf-8") as ckpt:
+
+        async def search_one(plcy_name, counties):
+            params = build_params(plcy_name)
+            async with slots:
+                # Cache hits don't spend rate-limit tokens
+                if cache.get(normalize_query(params)) is None:
+                    await bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    results, from_cache = await asyncio.to_thread(cached_search, params, cache, client)
+                except Exception as e:
+                    results, from_cache = {"error": str(e)}, False
+                latency = time.perf_counter() - started
+
+            if "error" in results:
+                stats["failed"] += 1
+                stats["failed_plans"].append(plcy_name)
+                print(f"  ✗ {plcy_name}: {results['error']}")
+                return
+
+            stats["latencies"].append(latency)
+            stats["cache_hits" if from_cache else "api_calls"] += 1
+            save_results(counties, plcy_name, results, store)
+            ckpt.write(json.dumps({"plan": plcy_name, "counties": counties}, ensure_ascii=False) + "\n")
+            ckpt.flush()
+            stats["done"] += 1
+
+        await asyncio.gather(*(search_one(p, c) for p, c in counties_by_plan.items()))
+
+    return stats
+
+
+def print_report(stats, elapsed):
+    latencies = stats["latencies"]
+    print("\n" + "=" * 60)
+    print(f"Searched:       {stats['done']} plan(s) ({stats['api_calls']} API, {stats['cache_hits']} cached)")
+    print(f"Failed:         {stats['failed']}")
+    print(f"Elapsed:        {elapsed:.1f}s")
+    print(f"Throughput:     {stats['done'] / elapsed if elapsed else 0.0:.2f} queries/s")
+    print(f"Latency p50:    {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"Latency p95:    {percentile(latencies, 95) * 1000:.0f} ms")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search policy PDFs for all parsed plans.")
+    parser.add_argument("--counties", nargs="*", help="only these counties (default: all *_plans.txt)")
+    parser.add_argument("--limit", type=int, help="search at most this many new plans")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="API calls per second (match your SerpAPI plan)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--fresh", action="store_true",
+                        help="start a new run: clear the checkpoint instead of resuming from it")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be searched")
+    args = parser.parse_args(argv)
 
-# Check if file already exists
-if file_path.exists():
-    raise FileExistsError("file collin_plans.txt already exist please delete the old file first")
+    county_plans = load_county_plans(counties=args.counties)
+    counties_by_plan = group_by_plan(county_plans)
+    if args.fresh and not args.dry_run:
+        Path(args.checkpoint).unlink(missing_ok=True)
+    done = set() if args.fresh else load_checkpoint(args.checkpoint)
+    pending = pending_searches(counties_by_plan, done)
+    checkpointed = len(counties_by_plan) - len(pending)
+    if args.limit is not None:
+        pending = dict(list(pending.items())[:args.limit])
 
-with open(file_path) as f:
-    content = f.read()
+    print(f"{len(county_plans)} county file(s), {len(counties_by_plan)} unique plan(s), "
+          f"{checkpointed} already checkpointed, "
+          f"{len(pending)} to search")
+    if args.dry_run or not pending:
+        return
 
-plcy_nm = [i for i in content.split('\n')]
+    started = time.perf_counter()
+    stats = asyncio.run(run_searches(pending, args.rate, args.concurrency, args.checkpoint))
+    print_report(stats, time.perf_counter() - started)
 
-# srch_plcy = plcy_nm[0:5]
 
-for plcy in srch_plcy:
-    policy_pdf_search('Collin', plcy)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
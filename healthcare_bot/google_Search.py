@@ -1,19 +1,22 @@
-from serpapi import GoogleSearch
 from dotenv import load_dotenv
 import os
 import json
+import sqlite3
+import threading
+import time
 from pathlib import Path
 
+from search_store import SearchStore
+
 # Load environment variables
 load_dotenv()
 # print(os.getenv('MYVAR'))
-OUTPUT_FOLDER = Path.home() / "OneDrive" / "Desktop" / "SIraj" / "policy_json"
+CACHE_FILE = Path(__file__).resolve().parent / "meta" / "search_cache.sqlite"
+CACHE_TTL = 30 * 24 * 3600  # seconds; plan documents change once a year
 
-def policy_pdf_search(county,plcy_name):
-     # Function to perform policy PDF search
- 
-    params = {
-        "api_key": os.getenv('MYVAR'),
+
+def build_params(plcy_name):
+    return {
         "engine": "google",
         'q': f'"2026 {plcy_name}" ("Summary of Benefits") filetype:pdf',
         "location": "Austin, Texas, United States",
@@ -22,14 +25,114 @@ def policy_pdf_search(county,plcy_name):
         "hl": "en"
     }
 
-    search = GoogleSearch(params)
-    results = search.get_dict()
 
-    # Build the output file path inside the folder
-    OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
-    output_file = OUTPUT_FOLDER / f"{county}_{plcy_name}.json"
+def normalize_query(params):
+    """Cache key: the query with case and whitespace folded, plus the other non-secret params."""
+    rest = {k: v for k, v in params.items() if k not in ("q", "api_key")}
+    q = " ".join(params["q"].lower().split())
+    return q + "|" + json.dumps(rest, sort_keys=True)
+
+
+def serpapi_client(params):
+    """Default search client: one paid SerpAPI call."""
+    from serpapi import GoogleSearch
+
+    return GoogleSearch({**params, "api_key": os.getenv('MYVAR')}).get_dict()
+
+
+class SearchCache:
+    """SQLite cache of search responses keyed on the normalized query, with TTL eviction.
+
+    Expired entries are deleted whenever the cache is opened.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL):
+        self.ttl = ttl
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " query TEXT PRIMARY KEY, results TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self.evict_expired()
+
+    def get(self, key):
+        """Cached results for key, or None if missing or older than the TTL."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT results, fetched_at FROM search_cache WHERE query = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, results):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)",
+                (key, json.dumps(results, ensure_ascii=False), time.time()),
+            )
+            self._db.commit()
+
+    def evict_expired(self):
+        """Delete entries older than the TTL; return how many were removed."""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM search_cache WHERE fetched_at < ?", (time.time() - self.ttl,)
+            )
+            self._db.commit()
+        return cur.rowcount
+
+    def close(self):
+        self._db.close()
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=4, ensure_ascii=False)
 
-    print(f"Response saved to: {output_file}")
+_default_cache = None
+_default_store = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SearchCache()
+    return _default_cache
+
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = SearchStore()
+    return _default_store
+
+
+def cached_search(params, cache=None, client=None):
+    """Return (results, from_cache). Error responses are not cached."""
+    cache = cache or default_cache()
+    client = client or serpapi_client
+    key = normalize_query(params)
+
+    results = cache.get(key)
+    if results is not None:
+        return results, True
+
+    results = client(params)
+    if "error" not in results:
+        cache.put(key, results)
+    return results, False
+
+
+def save_results(counties, plcy_name, results, store=None):
+    """Append one search response, for all counties listing the plan, to the result store."""
+    store = store or default_store()
+    store.append(plcy_name, counties, results)
+    print(f"Response saved: {plcy_name} ({', '.join(counties)})")
+
+
+def policy_pdf_search(county, plcy_name, cache=None, client=None, store=None):
+     # Function to perform policy PDF search
+
+    results, _ = cached_search(build_params(plcy_name), cache, client)
+    save_results([county], plcy_name, results, store)
+    return results
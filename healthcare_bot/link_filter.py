@@ -0,0 +1,396 @@
+"""
+Rank the search result links of each plan and keep the few worth downloading.
+
+doc_links.json holds every organic result of a plan's search: ANOCs,
+formularies, other states' plans, employer-group booklets. Each link is
+scored against its plan:
+
+- the CMS contract-plan ID (H0609-077) in the URL, or a different plan's ID
+- the plan year and state (UHC ``alphadog`` codes such as AATX26..., state names)
+- the document type in the file name (summary of benefits, EOC, ANOC, forms, ...)
+- the host (the plan's carrier, the medicareadvantage.com mirror, .gov sites)
+
+The most promising links are then probed with concurrent HEAD requests
+for status, content type and size (cached in meta/link_probes.jsonl), and
+the top-k links per plan are written in doc_links.json format for
+download_urls.py:
+
+    python link_filter.py                       # doc_links.json -> doc_links.filtered.json
+    python link_filter.py --top 2 --explain "H0432-003"
+    python link_filter.py --no-probe            # heuristics only, no network
+"""
+
+import argparse
+import http.client
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote, unquote, urljoin, urlparse
+
+from download_urls import REDIRECT_CODES, ConnectionPool
+from search_store import DOC_LINKS_FILE, META_DIR, iter_jsonl
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "poli_nm_parser"))
+from plan_records import parse_plan_name  # noqa: E402
+
+FILTERED_LINKS_FILE = BASE_DIR / "doc_links.filtered.json"
+PROBE_FILE = META_DIR / "link_probes.jsonl"
+TARGET_URL_FILE = META_DIR / "target_url.json"
+
+TOP_K = 3
+MIN_SCORE = 5
+PROBE_MAX_AGE = 7 * 24 * 3600
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# (label, pattern on the normalized URL, weight); every matching rule counts
+DOC_TYPES = (
+    # Codes may run into digits on the mirror (H0028007000SB26pdf, SB2025)
+    ("summary of benefits", r"(?<![a-z])sb(?![a-z])|summary of benefits", 4),
+    ("evidence of coverage", r"(?<![a-z])eoc(?![a-z])|evidence of coverage", 3),
+    ("annual notice of changes", r"(?<![a-z])anoc(?![a-z])|annual notice", -1),
+    ("formulary", r"formulary|drug list", -1),
+    ("directory", r"directory", -3),
+    ("enrollment form", r"enrollment form|\bapp\b|application", -4),
+    ("employer group", r"\beutf\b|\bpers\b|employer|retiree|\bgroup\b", -5),
+)
+
+CARRIER_DOMAINS = {
+    "UnitedHealthcare": ("uhc.com", "aarpmedicareplans.com"),
+    "Aetna": ("aetna.com", "aetnamedicare.com"),
+    "Humana": ("humana.com",),
+    "HealthSpring": ("healthspring.com", "cigna.com"),
+    "Blue Cross Blue Shield of Texas": ("bcbstx.com",),
+    "Baylor Scott & White": ("bswhealthplan.com",),
+    "Wellcare": ("wellcare.com",),
+    "Wellpoint": ("wellpoint.com",),
+    "Molina Healthcare": ("molinahealthcare.com",),
+}
+MIRROR_DOMAINS = ("medicareadvantage.com",)
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia",
+    "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa",
+    "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi", "MO": "Missouri",
+    "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire", "NJ": "New Jersey",
+    "NM": "New Mexico", "NY": "New York", "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio",
+    "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina",
+    "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont",
+    "VA": "Virginia", "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+# H0609-077, H0609-077-000 and the mirror's run-together H0609077000 (contract, plan, segment)
+PLAN_ID_RE = re.compile(r"\b([hrs]\d{4}) ?(\d{3})(?: ?(\d{3}))?(?!\d)")
+YEAR_RE = re.compile(r"\b(20\d{2})\b")
+# UHC document codes: AA + state + 2-digit year + plan type, e.g. AATX26HP0332801
+UHC_CODE_RE = re.compile(r"AA([A-Z]{2})(\d{2})[A-Z]{2}\d{4,}")
+# "MA" in a plan name means Medicare Advantage, not Massachusetts
+NAME_STATE_RE = re.compile(r"\b(?!MA\b)([A-Z]{2})(?:-\d+)?\b")
+
+
+def normalize(url):
+    """Lower-case, unquoted URL with every run of punctuation turned into one space."""
+    return " " + re.sub(r"[^a-z0-9]+", " ", unquote(url).lower()).strip() + " "
+
+
+def parse_entry(entry, county_states=None):
+    """Plan facts for a doc_links.json key like 'Dallas_Plan Name (HMO) - H0609-077-0.json'."""
+    county, _, plan_name = entry[:-len(".json")].partition("_") if entry.endswith(".json") else ("", "", entry)
+    record = parse_plan_name(plan_name.strip(), county)
+    states = [s for s in NAME_STATE_RE.findall(plan_name.split(" - ")[0]) if s in US_STATES]
+    record["state"] = states[-1] if states else (county_states or {}).get(county)
+    return record
+
+
+def load_county_states(path=TARGET_URL_FILE):
+    """{county: state} from the Q1Medicare target URLs (state=TX&showCounty=Dallas)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            urls = json.load(f)["urls"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    states = {}
+    for url in urls:
+        query = dict(part.partition("=")[::2] for part in urlparse(url).query.split("&"))
+        if query.get("showCounty") and query.get("state"):
+            states[unquote(query["showCounty"])] = query["state"].upper()
+    return states
+
+
+def url_years(url):
+    years = {int(y) for y in YEAR_RE.findall(normalize(url))}
+    years.update(2000 + int(yy) for _, yy in UHC_CODE_RE.findall(unquote(url).upper()))
+    return years
+
+
+def url_states(url):
+    text = normalize(url)
+    states = {state for state, _ in UHC_CODE_RE.findall(unquote(url).upper()) if state in US_STATES}
+    states.update(code for code, name in US_STATES.items() if f" {name.lower()} " in text)
+    return states
+
+
+def score_link(url, plan, year):
+    """Heuristic score of one link for one plan, with the reasons behind it."""
+    text = normalize(url)
+    host = urlparse(url).netloc.lower()
+    score, reasons = 0, []
+
+    def add(points, reason):
+        nonlocal score
+        score += points
+        reasons.append(f"{points:+d} {reason}")
+
+    if plan["contract_id"]:
+        contract, plan_id = plan["contract_id"].lower(), plan["plan_id"]
+        found = PLAN_ID_RE.findall(text)
+        ids = {(c, p) for c, p, _ in found}
+        if (contract, plan_id) in ids:
+            add(10, f"plan ID {plan['plan_key']}")
+            segment = int(plan["segment_id"])
+            segments = {int(s) for c, p, s in found if (c, p) == (contract, plan_id) and s}
+            if segment in segments or (not segments and re.search(rf"\b{contract} ?{plan_id} ?0*{segment}\b", text)):
+                add(2, "segment")
+        elif ids:
+            add(-8, f"other plan ID {'/'.join(f'{c}-{p}' for c, p in sorted(ids)).upper()}")
+        elif f" {contract} " in text:
+            add(3, f"contract {plan['contract_id']}")
+
+    years = url_years(url)
+    if year in years:
+        add(2, f"year {year}")
+    elif years and max(years) < year:
+        add(-4, f"old year {max(years)}")
+
+    states = url_states(url)
+    if plan["state"] and states:
+        if plan["state"] in states:
+            add(1, f"state {plan['state']}")
+        else:
+            add(-6, f"other state {'/'.join(sorted(states))}")
+
+    for label, pattern, points in DOC_TYPES:
+        if re.search(pattern, text):
+            add(points, label)
+
+    carrier = plan["carrier"] or ""
+    # Carriers not in the table usually live at <first word of their name>.com
+    domains = CARRIER_DOMAINS.get(carrier, ()) + tuple(f"{w.lower()}.com" for w in carrier.split()[:1])
+    if any(host == d or host.endswith("." + d) for d in domains):
+        add(2, "carrier site")
+    elif any(host.endswith(d) for d in MIRROR_DOMAINS):
+        add(1, "document mirror")
+    elif host.endswith((".gov", ".us")):
+        add(-5, "government site")
+
+    if urlparse(url).path.lower().endswith((".pdf", ".ashx")):
+        add(1, "pdf link")
+    return score, reasons
+
+
+def score_probe(probe):
+    """Adjustment from a HEAD probe; None if the link is dead."""
+    if probe is None:
+        return 0, []
+    if probe.get("error") or probe["status"] >= 400:
+        return None, [f"dead ({probe.get('error') or probe['status']})"]
+    ctype, size = probe.get("content_type") or "", probe.get("size")
+    score, reasons = 0, []
+    if "pdf" in ctype:
+        score, reasons = 2, ["+2 application/pdf"]
+    elif "html" in ctype:
+        score, reasons = -3, ["-3 html page"]
+    if size is not None and size < 20_000:
+        score -= 2
+        reasons.append(f"-2 tiny ({size} B)")
+    return score, reasons
+
+
+class LinkProber:
+    """Concurrent HEAD requests over keep-alive connections, cached on disk."""
+
+    def __init__(self, path=PROBE_FILE, workers=16, per_host=4, timeout=10, max_age=PROBE_MAX_AGE):
+        self.path = Path(path)
+        self.workers = workers
+        self.per_host = per_host
+        self.max_age = max_age
+        self.pool = ConnectionPool(timeout)
+        self.cache = {record["url"]: record for _, _, record in iter_jsonl(self.path)}
+        self._lock = threading.Lock()
+        self._host_slots = {}
+
+    def host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def request(self, method, url, headers, max_redirects=5):
+        """Send method to url following redirects; return (final response, final url).
+
+        Only the headers are read: a GET response's connection is dropped
+        instead of draining a body the server may send in full.
+        """
+        for _ in range(max_redirects + 1):
+            parsed = urlparse(url)
+            path = quote(parsed.path or "/", safe="/%:@!$&'()*+,;=~") + (f"?{parsed.query}" if parsed.query else "")
+            conn = self.pool.get(parsed.scheme, parsed.netloc)
+            try:
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                location = response.getheader("Location")
+                if method == "HEAD" or (response.status in REDIRECT_CODES and location):
+                    response.read()
+                else:
+                    self.pool.discard(parsed.scheme, parsed.netloc)
+            except (http.client.HTTPException, OSError):
+                self.pool.discard(parsed.scheme, parsed.netloc)
+                raise
+            if response.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            return response, url
+        raise OSError("too many redirects")
+
+    def probe(self, url):
+        headers = {"User-Agent": USER_AGENT}
+        record = {"url": url, "probed_at": time.time()}
+        try:
+            with self.host_slot(url):
+                response, final_url = self.request("HEAD", url, headers)
+                if response.status in (403, 405, 501):
+                    # Some carrier CDNs refuse HEAD; ask for the first byte instead
+                    response, final_url = self.request("GET", url, {**headers, "Range": "bytes=0-0"})
+            size = response.getheader("Content-Range", "").rpartition("/")[2] or response.getheader("Content-Length")
+            record.update(
+                status=response.status,
+                final_url=final_url,
+                content_type=(response.getheader("Content-Type") or "").split(";")[0].strip().lower(),
+                size=int(size) if size and size.isdigit() else None,
+            )
+        except (http.client.HTTPException, OSError) as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+    def probe_all(self, urls, refresh=False):
+        """{url: probe record} for urls, only hitting the network for new or expired ones."""
+        now = time.time()
+        todo = [u for u in urls if refresh or now - self.cache.get(u, {}).get("probed_at", 0) > self.max_age]
+        if todo:
+            print(f"Probing {len(todo)} link(s) ({len(urls) - len(todo)} cached)...")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor, \
+                        open(self.path, "a", encoding="utf-8") as out:
+                    for record in executor.map(self.probe, todo):
+                        self.cache[record["url"]] = record
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            finally:
+                self.pool.close_all()
+        return {u: self.cache.get(u) for u in urls}
+
+
+def plan_year(doc_links):
+    """Most common year mentioned by the links, i.e. the plan year being searched."""
+    years = Counter(max(y) for links in doc_links.values() for y in map(url_years, links) if y)
+    return years.most_common(1)[0][0] if years else time.localtime().tm_year
+
+
+def filter_links(doc_links, top_k=TOP_K, min_score=MIN_SCORE, prober=None, year=None, county_states=None):
+    """Return ({entry: kept links}, {entry: [(url, score, reasons)] best first})."""
+    year = year or plan_year(doc_links)
+    ranked = {}
+    for entry, links in doc_links.items():
+        plan = parse_entry(entry, county_states)
+        if not plan["plan_name"]:
+            # A search run with an empty plan name; nothing to rank its results against
+            ranked[entry] = []
+            continue
+        scored = [(url, *score_link(url, plan, year)) for url in dict.fromkeys(links)]
+        ranked[entry] = sorted(scored, key=lambda s: -s[1])
+
+    if prober is not None:
+        # Probe only links that a good probe could still lift over the bar
+        candidates = {url for scored in ranked.values() for url, score, _ in scored[:top_k * 2]
+                      if score >= min_score - 2}
+        probes = prober.probe_all(sorted(candidates))
+        for entry, scored in ranked.items():
+            rescored = []
+            for url, score, reasons in scored:
+                extra, why = score_probe(probes.get(url))
+                rescored.append((url, None if extra is None else score + extra, reasons + why))
+            ranked[entry] = sorted(rescored, key=lambda s: -(s[1] if s[1] is not None else -999))
+
+    kept = {entry: [url for url, score, _ in scored if score is not None and score >= min_score][:top_k]
+            for entry, scored in ranked.items()}
+    return kept, ranked
+
+
+def write_links(links, path=FILTERED_LINKS_FILE):
+    tmp_path = Path(path).with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(links, f, indent=4, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+def print_summary(doc_links, kept, prober):
+    total = sum(len(links) for links in doc_links.values())
+    print(f"\nKept {sum(map(len, kept.values()))} of {total} link(s) for "
+          f"{sum(1 for links in kept.values() if links)} of {len(doc_links)} plan(s)")
+    if prober is None:
+        return
+    sizes = {url: (prober.cache.get(url) or {}).get("size") for links in doc_links.values() for url in links}
+    kept_urls = {url for links in kept.values() for url in links}
+    known = {url: size for url, size in sizes.items() if size}
+    if known:
+        all_mb = sum(known.values()) / 1e6
+        kept_mb = sum(size for url, size in known.items() if url in kept_urls) / 1e6
+        print(f"Probed sizes: {kept_mb:.1f} MB kept of {all_mb:.1f} MB "
+              f"({len(known)} of {len(sizes)} unique URLs have a known size)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the top-k most relevant links per plan.")
+    parser.add_argument("json_file", nargs="?", default=DOC_LINKS_FILE)
+    parser.add_argument("out", nargs="?", default=FILTERED_LINKS_FILE)
+    parser.add_argument("--top", type=int, default=TOP_K, help="links to keep per plan")
+    parser.add_argument("--min-score", type=int, default=MIN_SCORE)
+    parser.add_argument("--year", type=int, help="plan year (default: most common year in the links)")
+    parser.add_argument("--no-probe", action="store_true", help="skip the HEAD requests")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent HEAD requests")
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--explain", metavar="TEXT", help="print the scoring of entries containing TEXT")
+    args = parser.parse_args(argv)
+
+    with open(args.json_file, encoding="utf-8") as f:
+        doc_links = json.load(f)
+
+    prober = None if args.no_probe else LinkProber(workers=args.workers, per_host=args.per_host)
+    started = time.perf_counter()
+    kept, ranked = filter_links(doc_links, args.top, args.min_score, prober, args.year, load_county_states())
+    write_links(kept, args.out)
+
+    if args.explain:
+        for entry, scored in ranked.items():
+            if args.explain.lower() not in entry.lower():
+                continue
+            print(f"\n{entry}")
+            for url, score, reasons in scored:
+                mark = "✓" if url in kept[entry] else " "
+                print(f"  {mark} {'dead' if score is None else score:>4}  {url}")
+                print(f"          {', '.join(reasons) or 'no signal'}")
+    print_summary(doc_links, kept, prober)
+    print(f"✓ Wrote {args.out} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
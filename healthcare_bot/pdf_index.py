@@ -0,0 +1,281 @@
+"""
+Full-text index over the downloaded plan documents.
+
+Text is pulled out of every PDF in ``pdf_file_downloads`` by a process pool,
+split into chunks per page and per section heading, and stored in a SQLite
+FTS5 table in ``meta/pdf_index.sqlite``. Documents are keyed by the SHA-256
+the downloader writes to ``pdf_file_downloads/manifest.jsonl``, so an update
+only extracts blobs it has not seen, drops blobs nothing refers to any more,
+and a brochure shared by many plans is extracted once.
+
+    python pdf_index.py update                  # index what the manifest added since last time
+    python pdf_index.py search dental copay     # best matching plans, with snippets
+    python pdf_index.py search 'NEAR("out of network" deductible, 5)' --raw
+
+Needs pypdf (pip install pypdf).
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from download_urls import DownloadManifest
+
+BASE_DIR = Path(__file__).resolve().parent
+DOWNLOAD_DIR = BASE_DIR / "pdf_file_downloads"
+INDEX_FILE = BASE_DIR / "meta" / "pdf_index.sqlite"
+
+MAX_CHUNK_CHARS = 2000
+COMMIT_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY, pages INTEGER, chunks INTEGER, error TEXT, indexed_at TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+    entry TEXT, url TEXT, path TEXT, sha256 TEXT, PRIMARY KEY (entry, url));
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY, sha256 TEXT, page INTEGER, section TEXT, text TEXT);
+CREATE INDEX IF NOT EXISTS chunks_sha256 ON chunks (sha256);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    section, text, content='chunks', content_rowid='id', tokenize='porter unicode61');
+CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, section, text) VALUES (new.id, new.section, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, section, text) VALUES ('delete', old.id, old.section, old.text);
+END;
+"""
+
+
+def connect(path=INDEX_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Extraction and chunking (run in worker processes)
+
+def is_heading(line):
+    """Short title-like line: 'DENTAL SERVICES', 'Prescription Drug Benefits:'."""
+    line = line.rstrip(":")
+    words = line.split()
+    if not 1 <= len(words) <= 8 or len(line) > 80 or line.endswith((".", ",", ";")):
+        return False
+    if not any(c.isalpha() for c in line) or "$" in line:
+        return False
+    if line.isupper():
+        return True
+    capitalized = sum(w[0].isupper() for w in words if len(w) > 3)
+    return len(words) >= 2 and capitalized == sum(len(w) > 3 for w in words) > 0
+
+
+def chunk_pages(pages):
+    """(page, section, text) chunks; a section heading carries over page breaks."""
+    section = ""
+    for page_no, text in enumerate(pages, 1):
+        lines, size = [], 0
+        for line in (text or "").splitlines():
+            line = " ".join(line.split())
+            if not line:
+                continue
+            if is_heading(line) or size >= MAX_CHUNK_CHARS:
+                if lines:
+                    yield page_no, section, "\n".join(lines)
+                lines, size = [], 0
+                if is_heading(line):
+                    section = line.rstrip(":")
+                    continue
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            yield page_no, section, "\n".join(lines)
+
+
+def extract_document(sha256, path):
+    """Return (sha256, page count, chunks, error) for one downloaded file."""
+    try:
+        with open(path, "rb") as f:
+            # Carrier sites often serve an HTML landing page where a PDF was expected
+            if not f.read(1024).lstrip().startswith(b"%PDF"):
+                return sha256, 0, [], "not a PDF"
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                # One unreadable page should not drop the rest of the document
+                pages.append("")
+        return sha256, len(pages), list(chunk_pages(pages)), None
+    except Exception as e:
+        return sha256, 0, [], f"{type(e).__name__}: {e}"
+
+
+# Index maintenance
+
+def manifest_documents(download_dir=DOWNLOAD_DIR):
+    """Completed downloads from the manifest: ({sha256: path}, [(entry, url, path, sha256)])."""
+    download_dir = Path(download_dir)
+    files, entries = {}, []
+    for record in DownloadManifest(download_dir).records.values():
+        sha256 = record.get("sha256")
+        if record.get("partial") or not sha256 or not record.get("path"):
+            continue
+        path = download_dir / record["path"]
+        if not path.exists():
+            continue
+        files.setdefault(sha256, path)
+        entries.append((record["entry"], record["url"], record["path"], sha256))
+    return files, entries
+
+
+def update_index(conn, download_dir=DOWNLOAD_DIR, workers=None, retry_failed=False):
+    """Bring the index in line with the download manifest; return counts."""
+    started = time.perf_counter()
+    files, entries = manifest_documents(download_dir)
+
+    with conn:
+        conn.execute("DELETE FROM entries")
+        conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", entries)
+        if retry_failed:
+            conn.execute("DELETE FROM documents WHERE error IS NOT NULL")
+        known = {sha for (sha,) in conn.execute("SELECT sha256 FROM documents")}
+        removed = known - files.keys()
+        for sha in removed:
+            conn.execute("DELETE FROM chunks WHERE sha256 = ?", (sha,))
+            conn.execute("DELETE FROM documents WHERE sha256 = ?", (sha,))
+
+    todo = sorted(files.keys() - known)
+    stats = {"documents": len(files), "entries": len(entries), "added": 0, "failed": 0,
+             "removed": len(removed), "chunks": 0}
+    if todo:
+        print(f"Extracting {len(todo)} new document(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(extract_document, todo, [str(files[sha]) for sha in todo], chunksize=4)
+            for n, (sha, pages, chunks, error) in enumerate(results, 1):
+                conn.executemany("INSERT INTO chunks (sha256, page, section, text) VALUES (?, ?, ?, ?)",
+                                 [(sha, *chunk) for chunk in chunks])
+                conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                             (sha, pages, len(chunks), error,
+                              datetime.now(timezone.utc).isoformat(timespec="seconds")))
+                if error:
+                    stats["failed"] += 1
+                    print(f"  ✗ {files[sha].name}: {error}")
+                else:
+                    stats["added"] += 1
+                    stats["chunks"] += len(chunks)
+                # Commit in batches so an interrupted update keeps what it finished
+                if n % COMMIT_EVERY == 0:
+                    conn.commit()
+                    print(f"  {n}/{len(todo)}")
+        conn.commit()
+    if removed or todo:
+        conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+        conn.commit()
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+# Queries
+
+def to_match_query(text):
+    """Plain words -> an FTS5 query that needs all of them (prefix match on the last)."""
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    return " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def search(conn, query, limit=10, raw=False):
+    """Best matching plan entries as dicts, with the chunk that matched best for each."""
+    match = query if raw else to_match_query(query)
+    if not match:
+        return []
+    # Rank chunks first, then fan out to the plans whose downloads contain them
+    rows = conn.execute(
+        """
+        SELECT chunks_fts.rowid, c.sha256, c.page, c.section, bm25(chunks_fts, 2.0, 1.0) AS rank
+        FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+        WHERE chunks_fts MATCH ?
+        ORDER BY rank LIMIT ?
+        """,
+        (match, limit * 20),
+    ).fetchall()
+
+    results, seen = [], set()
+    for rowid, sha, page, section, rank in rows:
+        for entry, url, path in conn.execute(
+                "SELECT entry, url, path FROM entries WHERE sha256 = ? ORDER BY entry", (sha,)):
+            if entry in seen:
+                continue
+            seen.add(entry)
+            results.append({"entry": entry, "url": url, "path": path, "page": page, "section": section,
+                            "score": round(-rank, 3), "rowid": rowid})
+            if len(results) == limit:
+                break
+        if len(results) == limit:
+            break
+
+    # Snippets are the slow part of a query, so only build them for the chunks shown
+    for result in results:
+        result["snippet"] = conn.execute(
+            "SELECT snippet(chunks_fts, 1, '[', ']', '…', 16) FROM chunks_fts WHERE chunks_fts MATCH ? AND rowid = ?",
+            (match, result.pop("rowid")),
+        ).fetchone()[0]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text index over the downloaded plan PDFs.")
+    parser.add_argument("--index", default=INDEX_FILE, help="SQLite index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="index new downloads, drop removed ones")
+    update.add_argument("--downloads", default=DOWNLOAD_DIR, help="downloader output directory")
+    update.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    update.add_argument("--retry-failed", action="store_true", help="extract previously failed files again")
+
+    query = commands.add_parser("search", help="find plans whose documents mention the words")
+    query.add_argument("query", nargs="+")
+    query.add_argument("--limit", type=int, default=10)
+    query.add_argument("--raw", action="store_true", help="pass the query to FTS5 as-is")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.index)
+    if args.command == "update":
+        stats = update_index(conn, args.downloads, args.workers, args.retry_failed)
+        print(f"{stats['documents']} document(s) for {stats['entries']} download(s): "
+              f"{stats['added']} added ({stats['chunks']} chunks), {stats['failed']} failed, "
+              f"{stats['removed']} removed in {stats['seconds']}s")
+        return 0
+
+    started = time.perf_counter()
+    try:
+        results = search(conn, " ".join(args.query), args.limit, args.raw)
+    except sqlite3.OperationalError as e:
+        print(f"Bad query: {e}")
+        return 2
+    elapsed = (time.perf_counter() - started) * 1000
+    for result in results:
+        print(f"\n{result['entry']}  (score {result['score']}, page {result['page']})")
+        if result["section"]:
+            print(f"  § {result['section']}")
+        print(f"  {result['snippet'].replace(chr(10), ' ')}")
+        print(f"  {result['path']}")
+    print(f"\n{len(results)} plan(s) in {elapsed:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,345 @@
+"""
+Run the whole healthcare_bot pipeline, re-running only what changed.
+
+    scrape[county] -> parse[county] -> search[county] --> links -> filter -> download -> index
+                                   \\-> records (plans.arrow)
+
+There is one scrape/parse/search branch per county in meta/target_url.json.
+The inputs of every node (target URL, upstream files, the stage's own code)
+and its outputs are hashed into meta/pipeline_state.json. A node runs again
+only when its input hash changed, an output went missing or was edited, or
+it is forced. Adding a county therefore scrapes, parses and searches just
+that county before links and download pick it up, and a re-scrape that
+yields identical HTML stops there.
+
+Stale county branches of a stage run together: scrape in browser tabs,
+parse in a process pool, search under one shared rate limit.
+
+    python pipeline.py --dry-run               # show what would run
+    python pipeline.py                         # attach to Chrome on :9222 like Step 4
+    python pipeline.py --counties Dallas --force scrape
+    python pipeline.py --until links           # stop before downloading
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+SCRAPER_DIR = BASE_DIR / "poli_nm_scrapper"
+PARSER_DIR = BASE_DIR / "poli_nm_parser"
+META_DIR = BASE_DIR / "meta"
+TARGET_URL_FILE = META_DIR / "target_url.json"
+STATE_FILE = META_DIR / "pipeline_state.json"
+DOWNLOAD_DIR = BASE_DIR / "pdf_file_downloads"
+
+# Stage modules live next to their data
+sys.path[:0] = [str(SCRAPER_DIR), str(PARSER_DIR)]
+
+STAGES = ["scrape", "parse", "records", "search", "links", "filter", "download", "index"]
+
+
+def file_digest(path):
+    """SHA-256 of a file, or None if it does not exist."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Node:
+    """One stage for one county (or for all counties when county is None)."""
+
+    def __init__(self, stage, county=None, deps=(), files=(), values=(), code=(), outputs=()):
+        self.stage = stage
+        self.county = county
+        self.key = f"{stage}:{county}" if county else stage
+        self.deps = list(deps)
+        self.files = [Path(p) for p in files]
+        self.values = list(values)
+        self.code = [Path(p) for p in code]
+        self.outputs = [Path(p) for p in outputs]
+
+    def input_digest(self):
+        parts = {
+            "values": self.values,
+            "files": {p.name: file_digest(p) for p in self.files},
+            "code": {p.name: file_digest(p) for p in self.code},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def output_digests(self):
+        return {p.name: file_digest(p) for p in self.outputs}
+
+
+class PipelineState:
+    """Input/output hashes of the last successful run of each node."""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = Path(path)
+        self.nodes = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.nodes = json.load(f)
+
+    def is_stale(self, node):
+        record = self.nodes.get(node.key)
+        if record is None or record["inputs"] != node.input_digest():
+            return True
+        return record["outputs"] != node.output_digests()
+
+    def record(self, node, inputs):
+        self.nodes[node.key] = {"inputs": inputs, "outputs": node.output_digests(), "updated": time.time()}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.nodes, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def build_graph(urls, top=3):
+    """Nodes for every county in urls plus the shared stages, in stage order."""
+    from link_filter import FILTERED_LINKS_FILE
+    from policy_nm_scrapper_from_q1 import county_file_path
+    from search_store import DOC_LINKS_FILE, STORE_FILE
+
+    nodes = []
+    counties = []
+    for url in urls:
+        html_file = county_file_path(url, SCRAPER_DIR)
+        county = html_file.stem
+        plans_file = PARSER_DIR / f"{county}_plans.txt"
+        counties.append((county, plans_file))
+        nodes.append(Node("scrape", county, values=[url], outputs=[html_file]))
+        nodes.append(Node("parse", county, deps=[f"scrape:{county}"], files=[html_file],
+                          code=[PARSER_DIR / "plan_extract.py", PARSER_DIR / "policy_nm_parse.py"],
+                          outputs=[plans_file]))
+        nodes.append(Node("search", county, deps=[f"parse:{county}"], files=[plans_file]))
+
+    nodes.append(Node("records", deps=[f"parse:{c}" for c, _ in counties],
+                      files=[p for _, p in counties], code=[PARSER_DIR / "plan_records.py"],
+                      outputs=[PARSER_DIR / "plans.arrow"]))
+    nodes.append(Node("links", deps=[f"search:{c}" for c, _ in counties],
+                      files=[STORE_FILE], code=[BASE_DIR / "search_store.py"], outputs=[DOC_LINKS_FILE]))
+    nodes.append(Node("filter", deps=["links"], files=[DOC_LINKS_FILE, TARGET_URL_FILE],
+                      values=[top], code=[BASE_DIR / "link_filter.py"], outputs=[FILTERED_LINKS_FILE]))
+    nodes.append(Node("download", deps=["filter"], files=[FILTERED_LINKS_FILE]))
+    # Whatever did download is worth indexing, so a failed URL does not block this
+    nodes.append(Node("index", files=[DOWNLOAD_DIR / "manifest.jsonl"]))
+    return nodes
+
+
+# Stage runners: take the stale nodes of one stage, return the keys that succeeded
+
+def run_scrape(nodes, args):
+    from policy_nm_scrapper_from_q1 import get_cdp_ws, scrape_all
+
+    saved = asyncio.run(scrape_all(
+        [node.values[0] for node in nodes],
+        cdp_ws=None if args.launch else get_cdp_ws(),
+        tabs=args.tabs,
+        out_dir=SCRAPER_DIR,
+    ))
+    # Failed and timed-out pages are logged and left out; their old HTML stays in place
+    return {node.key for node in nodes if node.values[0] in saved}
+
+
+def run_parse(nodes, args):
+    from policy_nm_parse import parse_counties, write_plans
+
+    html_files = [node.files[0] for node in nodes]
+    done = set()
+    for node, (html_file, plan_links, seconds, error) in zip(
+            nodes, parse_counties(html_files, args.backend, args.parse_workers)):
+        if error:
+            print(f"  ✗ {html_file.name}: {error}")
+            continue
+        write_plans(html_file, plan_links, PARSER_DIR)
+        print(f"  ✓ {node.county}: {len(plan_links)} plans ({seconds * 1000:.0f} ms)")
+        done.add(node.key)
+    return done
+
+
+def run_records(nodes, args):
+    from plan_records import parse_plan_name, write_records
+
+    node = nodes[0]
+    records = []
+    for plans_file in node.files:
+        county = plans_file.name[:-len("_plans.txt")]
+        with open(plans_file, encoding="utf-8") as f:
+            records.extend(parse_plan_name(line.strip(), county) for line in f if line.strip())
+    try:
+        write_records(records, node.outputs[0])
+    except ImportError:
+        print("  ! pyarrow not installed, skipping structured plan records")
+        return set()
+    print(f"  ✓ {len(records)} plan records → {node.outputs[0].name}")
+    return {node.key}
+
+
+def run_search(nodes, args):
+    from get_plcy_file_link import group_by_plan, load_county_plans, print_report, run_searches
+
+    county_plans = load_county_plans(PARSER_DIR, [node.county for node in nodes])
+    started = time.perf_counter()
+    # Plans already searched for another county come from the cache without an API call
+    stats = asyncio.run(run_searches(group_by_plan(county_plans), args.rate, args.concurrency))
+    print_report(stats, time.perf_counter() - started)
+    failed = set(stats["failed_plans"])
+    return {node.key for node in nodes if not failed & set(county_plans.get(node.county, []))}
+
+
+def run_links(nodes, args):
+    from search_store import LinkIndex, SearchStore
+
+    index = LinkIndex(SearchStore())
+    index.update()
+    index.build_doc_links()
+    return {nodes[0].key}
+
+
+def run_filter(nodes, args):
+    from link_filter import LinkProber, filter_links, load_county_states, print_summary, write_links
+
+    node = nodes[0]
+    with open(node.files[0], encoding="utf-8") as f:
+        doc_links = json.load(f)
+    prober = LinkProber(workers=args.download_workers, per_host=args.per_host)
+    kept, _ = filter_links(doc_links, node.values[0], prober=prober, county_states=load_county_states(node.files[1]))
+    write_links(kept, node.outputs[0])
+    print_summary(doc_links, kept, prober)
+    return {node.key}
+
+
+def run_download(nodes, args):
+    from download_urls import URLDownloader
+
+    downloader = URLDownloader(str(nodes[0].files[0]), str(DOWNLOAD_DIR),
+                               workers=args.download_workers, per_host=args.per_host)
+    downloader.download_all()
+    # Failed URLs are retried on the next run; the downloader skips unchanged files
+    return {nodes[0].key} if downloader.stats["failed"] == 0 else set()
+
+
+def run_index(nodes, args):
+    from pdf_index import connect, update_index
+
+    stats = update_index(connect(), DOWNLOAD_DIR, args.parse_workers)
+    print(f"  ✓ {stats['added']} document(s) indexed, {stats['failed']} failed, {stats['removed']} removed")
+    return {nodes[0].key}
+
+
+RUNNERS = {
+    "scrape": run_scrape,
+    "parse": run_parse,
+    "records": run_records,
+    "search": run_search,
+    "links": run_links,
+    "filter": run_filter,
+    "download": run_download,
+    "index": run_index,
+}
+
+
+def run_pipeline(nodes, state, args):
+    """Run stale nodes stage by stage; return {node key: status}."""
+    status = {}
+    forced = set(args.force or [])
+    last = STAGES.index(args.until) if args.until else len(STAGES) - 1
+
+    for stage in STAGES[:last + 1]:
+        stale = []
+        for node in (n for n in nodes if n.stage == stage):
+            dep_status = [status.get(dep) for dep in node.deps]
+            if node.county and args.counties and node.county not in args.counties:
+                status[node.key] = "skipped"
+            elif any(s in ("failed", "blocked") for s in dep_status):
+                status[node.key] = "blocked"
+            elif stage in forced or "pending" in dep_status or state.is_stale(node):
+                stale.append(node)
+            else:
+                status[node.key] = "cached"
+
+        if not stale:
+            continue
+        print(f"\n▶ {stage}: {', '.join(n.county or n.key for n in stale)}")
+        if args.dry_run:
+            # Downstream inputs are unknown until this runs, so treat them as stale too
+            status.update({n.key: "pending" for n in stale})
+            continue
+
+        inputs = {n.key: n.input_digest() for n in stale}
+        try:
+            done = RUNNERS[stage](stale, args)
+        except Exception as e:
+            print(f"  ✗ {stage} failed: {e!r}")
+            done = set()
+        for node in stale:
+            if node.key in done:
+                state.record(node, inputs[node.key])
+                status[node.key] = "ran"
+            else:
+                status[node.key] = "failed"
+        state.save()
+
+    return status
+
+
+def print_status(status):
+    print("\n" + "=" * 60)
+    for stage in STAGES:
+        counts = {}
+        for key, value in status.items():
+            if key.split(":")[0] == stage:
+                counts[value] = counts.get(value, 0) + 1
+        if counts:
+            print(f"{stage:<10} " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scrape → parse → search → links → filter → download → index pipeline.")
+    parser.add_argument("--targets", default=TARGET_URL_FILE, help="JSON file with a 'urls' list")
+    parser.add_argument("--counties", nargs="*", help="only these county branches (default: all targets)")
+    parser.add_argument("--force", nargs="*", choices=STAGES, help="re-run these stages even if cached")
+    parser.add_argument("--until", choices=STAGES, help="stop after this stage")
+    parser.add_argument("--dry-run", action="store_true", help="only show which nodes would run")
+    parser.add_argument("--state", default=STATE_FILE)
+    # Stage options (see the individual scripts)
+    parser.add_argument("--launch", action="store_true", help="scrape with headless Chromium instead of CDP")
+    parser.add_argument("--tabs", type=int, default=4)
+    parser.add_argument("--backend", default=None, help="plan extraction backend")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rate", type=float, default=1.0, help="SerpAPI calls per second")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--top", type=int, default=3, help="links kept per plan by the filter stage")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    from policy_nm_scrapper_from_q1 import load_target_urls
+
+    # The shared stages always see every target county; --counties only limits which branches run
+    urls = load_target_urls(args.targets)
+    state = PipelineState(args.state)
+    started = time.perf_counter()
+    status = run_pipeline(build_graph(urls, args.top), state, args)
+    print_status(status)
+    print(f"{'Planned' if args.dry_run else 'Finished'} in {time.perf_counter() - started:.1f}s")
+    return 1 if "failed" in status.values() else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""
+Benchmark the plan-name extraction backends on the checked-in county HTML.
+
+Each backend is checked against the bs4 reference output before timing.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from plan_extract import BACKENDS, extract_plan_names
+
+SOURCE_DIR = Path(__file__).resolve().parent.parent / "poli_nm_scrapper"
+
+
+def available_backends():
+    names = []
+    for name in BACKENDS:
+        try:
+            extract_plan_names(next(SOURCE_DIR.glob("*.html")), name)
+            names.append(name)
+        except ImportError:
+            print(f"(skipping {name}: not installed)")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    html_files = sorted(SOURCE_DIR.glob("*.html"))
+    backends = available_backends()
+
+    reference = {f: extract_plan_names(f, "bs4") for f in html_files} if "bs4" in backends else None
+
+    print(f"{'file':<14}" + "".join(f"{b:>12}" for b in backends))
+    totals = dict.fromkeys(backends, 0.0)
+    for html_file in html_files:
+        row = f"{html_file.stem:<14}"
+        for backend in backends:
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                plans = extract_plan_names(html_file, backend)
+                best = min(best, time.perf_counter() - started)
+            if reference is not None and plans != reference[html_file]:
+                raise SystemExit(f"{backend} output differs from bs4 on {html_file.name}")
+            totals[backend] += best
+            row += f"{best * 1000:>10.1f}ms"
+        print(row)
+
+    print(f"{'total':<14}" + "".join(f"{totals[b] * 1000:>10.1f}ms" for b in backends))
+    if "bs4" in totals:
+        print(f"{'speedup':<14}" + "".join(f"{totals['bs4'] / totals[b]:>11.1f}x" for b in backends))
+
+
+if __name__ == "__main__":
+    main()
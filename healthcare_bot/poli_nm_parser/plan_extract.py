@@ -0,0 +1,166 @@
+"""
+Plan-name extraction backends for Q1Medicare county HTML pages.
+
+Every backend returns the text of each <a> whose href points at the plan
+benefits page and whose title contains "View Enrollment Options", in
+document order, with the same text rules as BeautifulSoup's
+``get_text(strip=True)`` (each text node stripped, empty ones dropped,
+the rest joined without a separator).
+
+    bs4   - BeautifulSoup + html.parser; builds the full tree (reference)
+    lxml  - lxml iterparse over <a> end events (C parser)
+    scan  - stdlib HTMLParser fed in chunks; never builds a tree
+"""
+
+from html.parser import HTMLParser
+
+PLAN_HREF = "MedicareAdvantage-2026C-MedicareHealthPlanBenefits.php"
+PLAN_TITLE = "View Enrollment Options"
+CHUNK_SIZE = 64 * 1024
+
+# Strings inside these elements are not part of get_text()
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+def is_plan_link(href, title):
+    # Condition 1 → Medicare plan link
+    # Condition 2 → Title must contain specific phrase
+    return href is not None and PLAN_HREF in href and PLAN_TITLE in (title or "")
+
+
+def extract_bs4(f):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(f.read(), "html.parser")
+    plan_links = []
+    for a in soup.find_all("a", href=True):
+        if not is_plan_link(a["href"], a.get("title", "")):
+            continue
+        # Extract text as plan name
+        plan_links.append(a.get_text(strip=True))
+    return plan_links
+
+
+def extract_lxml(f):
+    from lxml import etree
+
+    plan_links = []
+    for _, a in etree.iterparse(f, events=("end",), tag="a", html=True, recover=True,
+                                encoding="utf-8"):
+        if is_plan_link(a.get("href"), a.get("title")):
+            plan_links.append("".join(s.strip() for s in a.xpath(".//text()")))
+        # Drop finished siblings to keep memory flat, unless an outer <a> still needs them
+        if next(a.iterancestors("a"), None) is None:
+            a.clear(keep_tail=True)
+            while a.getprevious() is not None:
+                del a.getparent()[0]
+    return plan_links
+
+
+class PlanLinkScanner(HTMLParser):
+    """SAX-style scanner: tracks open plan <a> tags and collects their text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.plan_links = []
+        self._open = []        # one entry per open <a>: (slot, strings), or None if not a plan link
+        self._data = []        # pending text node, flushed at the next markup event
+        self._skip = 0         # depth inside script/style/template
+
+    def _flush(self):
+        if not self._data:
+            return
+        text = "".join(self._data).strip()
+        self._data = []
+        if text and not self._skip:
+            for link in self._open:
+                if link is not None:
+                    link[1].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag == "a":
+            attrs = dict(attrs)
+            link = None
+            if is_plan_link(attrs.get("href"), attrs.get("title")):
+                # Reserve the slot now so nested links keep document order
+                link = (len(self.plan_links), [])
+                self.plan_links.append("")
+            self._open.append(link)
+        elif tag in NON_TEXT_TAGS:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        if tag == "a":
+            attrs = dict(attrs)
+            if is_plan_link(attrs.get("href"), attrs.get("title")):
+                self.plan_links.append("")
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag == "a" and self._open:
+            self._close_link(self._open.pop())
+        elif tag in NON_TEXT_TAGS and self._skip:
+            self._skip -= 1
+
+    def _close_link(self, link):
+        if link is not None:
+            slot, parts = link
+            self.plan_links[slot] = "".join(parts)
+
+    def handle_data(self, data):
+        if self._open:
+            self._data.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+        # Unclosed anchors still count, as BeautifulSoup closes them at EOF
+        while self._open:
+            self._close_link(self._open.pop())
+
+
+def extract_scan(f):
+    scanner = PlanLinkScanner()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+        scanner.feed(chunk)
+    scanner.close()
+    return scanner.plan_links
+
+
+BACKENDS = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "scan": extract_scan,
+}
+
+
+def default_backend():
+    """Fastest backend that can be imported here."""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "scan"
+
+
+def extract_plan_names(html_file, backend=None):
+    """Extract plan names from one HTML file with the chosen backend."""
+    backend = backend or default_backend()
+    extract = BACKENDS[backend]
+    # lxml decodes the bytes itself; the others read text
+    if backend == "lxml":
+        with open(html_file, "rb") as f:
+            return extract(f)
+    with open(html_file, "r", encoding="utf-8") as f:
+        return extract(f)
@@ -0,0 +1,123 @@
+"""
+Structured plan records in a columnar Arrow IPC file.
+
+Plan link texts look like
+
+    AARP Medicare Advantage CareFlex from UHC TX-44 (HMO-POS) - H0609-077-0
+
+and are split once into carrier, plan type, SNP type and the CMS
+contract-plan-segment ID. All counties go into one Arrow IPC file that
+can be memory-mapped, so a cross-county question such as "which counties
+offer H0609-077" is a vectorized filter instead of re-parsing text files:
+
+    python plan_records.py H0609-077
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "plans.arrow"
+
+PLAN_RE = re.compile(
+    r"^(?P<name>.*?)\s*\((?P<kind>[^()]*)\)\s*-\s*"
+    r"(?P<contract>[A-Z]\d{4})-(?P<plan>\d{3})-(?P<segment>\d+)$"
+)
+SNP_RE = re.compile(r"\s*\b([CDI]-SNP)$")
+
+# Name prefix → carrier; first match wins
+CARRIERS = (
+    ("AARP", "UnitedHealthcare"),
+    ("UHC", "UnitedHealthcare"),
+    ("Aetna", "Aetna"),
+    ("Humana", "Humana"),
+    ("HealthSpring", "HealthSpring"),
+    ("Blue Cross", "Blue Cross Blue Shield of Texas"),
+    ("BSW", "Baylor Scott & White"),
+    ("Wellcare", "Wellcare"),
+    ("Wellpoint", "Wellpoint"),
+    ("Molina", "Molina Healthcare"),
+    ("Erickson", "Erickson Advantage"),
+    ("ProCare", "ProCare Advantage"),
+    ("Verda", "Verda Healthcare"),
+    ("American Health", "American Health Advantage of Texas"),
+    ("Provider Partners", "Provider Partners Health Plan"),
+    ("Texas Independence", "Texas Independence Health Plan"),
+)
+
+COLUMNS = (
+    "county", "plan_name", "carrier", "plan_type", "snp_type",
+    "contract_id", "plan_id", "segment_id", "plan_key", "cpsid",
+)
+
+
+def carrier_for(name):
+    for prefix, carrier in CARRIERS:
+        if name.startswith(prefix):
+            return carrier
+    return name.split(" ", 1)[0]
+
+
+def parse_plan_name(text, county):
+    """Split one plan link text into a record dict (ID fields are None if it doesn't match)."""
+    record = dict.fromkeys(COLUMNS)
+    record.update(county=county, plan_name=text, carrier=carrier_for(text))
+
+    m = PLAN_RE.match(text)
+    if not m:
+        return record
+
+    kind = m["kind"]
+    snp = SNP_RE.search(kind)
+    contract, plan, segment = m["contract"], m["plan"], m["segment"]
+    record.update(
+        plan_type=kind[:snp.start()] if snp else kind,
+        snp_type=snp.group(1) if snp else None,
+        contract_id=contract,
+        plan_id=plan,
+        segment_id=segment,
+        plan_key=f"{contract}-{plan}",
+        cpsid=f"{contract}-{plan}-{segment}",
+    )
+    return record
+
+
+def write_records(records, path=DEFAULT_PATH):
+    """Write records (dicts with COLUMNS) to an uncompressed Arrow IPC file."""
+    import pyarrow as pa
+
+    schema = pa.schema([(name, pa.string()) for name in COLUMNS])
+    table = pa.Table.from_pylist(list(records), schema=schema)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+    return table.num_rows
+
+
+def load_records(path=DEFAULT_PATH):
+    """Memory-map the Arrow IPC file and return it as a Table (zero-copy)."""
+    import pyarrow as pa
+
+    source = pa.memory_map(str(path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def counties_offering(table, plan_key):
+    """Sorted counties offering a plan, by plan_key (H0609-077) or full cpsid (H0609-077-0)."""
+    import pyarrow.compute as pc
+
+    column = "cpsid" if plan_key.count("-") == 2 else "plan_key"
+    matches = table.filter(pc.equal(table[column], plan_key))
+    return sorted(set(matches["county"].to_pylist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the plan records file.")
+    parser.add_argument("plan_key", help="e.g. H0609-077 or H0609-077-0")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    counties = counties_offering(load_records(args.path), args.plan_key)
+    print(f"{args.plan_key}: {len(counties)} county(ies)")
+    for county in counties:
+        print(f"  {county}")
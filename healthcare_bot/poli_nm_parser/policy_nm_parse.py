@@ -1,7 +1,12 @@
-from bs4 import BeautifulSoup
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from plan_extract import BACKENDS, default_backend, extract_plan_names
+from plan_records import parse_plan_name, write_records
+
 # Source directory containing HTML files
 # Get the parent directory of the script location
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,59 +14,107 @@ parent_dir = os.path.dirname(script_dir)
 SOURCE_DIR = os.path.join(parent_dir, "poli_nm_scrapper")
 OUTPUT_DIR = script_dir  # Save output files in script directory
 
-# Create output directory if needed
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Find all HTML files in source directory
-html_files = list(Path(SOURCE_DIR).glob("*.html")) + list(Path(SOURCE_DIR).glob("*.htm"))
+def find_html_files(source_dir=SOURCE_DIR):
+    """All county HTML files in source_dir, sorted by name."""
+    html_files = list(Path(source_dir).glob("*.html")) + list(Path(source_dir).glob("*.htm"))
+    return sorted(html_files)
+
+
+def parse_county(html_file, backend=None):
+    """Parse one county page; return (html_file, plan_links, seconds, error)."""
+    started = time.perf_counter()
+    try:
+        plan_links = extract_plan_names(html_file, backend)
+        return html_file, plan_links, time.perf_counter() - started, None
+    except Exception as e:
+        return html_file, [], time.perf_counter() - started, str(e)
 
-if not html_files:
-    print(f"No HTML files found in {SOURCE_DIR}")
-    exit(1)
 
-print(f"Found {len(html_files)} HTML file(s)\n")
+def parse_counties(html_files, backend=None, workers=1):
+    """Yield parse_county results in input order, using a process pool when workers > 1."""
+    backend = backend or default_backend()
+    if workers <= 1:
+        for html_file in html_files:
+            yield parse_county(html_file, backend)
+        return
 
-total_plans = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() keeps input order, so output stays deterministic
+        yield from executor.map(parse_county, html_files, [backend] * len(html_files))
 
-for html_file in sorted(html_files):
-    print(f"Processing: {html_file.name}")
-    
-    try:
-        with open(html_file, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f.read(), "html.parser")
-        
-        plan_links = []
-        
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            title = a.get("title", "")
-        
-            # Condition 1 → Medicare plan link
-            if "MedicareAdvantage-2026C-MedicareHealthPlanBenefits.php" not in href:
-                continue
-        
-            # Condition 2 → Title must contain specific phrase
-            if "View Enrollment Options" not in title:
-                continue
-        
-            # Extract text as plan name
-            name = a.get_text(strip=True)
-            plan_links.append(name)
-        
-        # Generate output filename based on input filename
-        output_filename = html_file.stem + "_plans.txt"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
-        # Save results
-        with open(output_path, "w", encoding="utf-8") as f:
-            for name in plan_links:
-                f.write(f"{name}\n")
-        
-        print(f"  ✓ Extracted {len(plan_links)} plans → {output_filename}\n")
+
+def write_plans(html_file, plan_links, output_dir=OUTPUT_DIR):
+    """Write <county>_plans.txt; return the output filename."""
+    # Generate output filename based on input filename
+    output_filename = Path(html_file).stem + "_plans.txt"
+    output_path = os.path.join(output_dir, output_filename)
+
+    # Save results
+    with open(output_path, "w", encoding="utf-8") as f:
+        for name in plan_links:
+            f.write(f"{name}\n")
+    return output_filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract plan names from county HTML files.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=default_backend(),
+                        help="HTML extraction backend (bs4 is the slow reference)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse counties in a pool of this many processes")
+    parser.add_argument("--source-dir", default=SOURCE_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--records", default=None,
+                        help="Arrow IPC file for structured plan records (default: <output-dir>/plans.arrow)")
+    parser.add_argument("--no-records", action="store_true", help="only write the *_plans.txt files")
+    args = parser.parse_args(argv)
+
+    # Create output directory if needed
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Find all HTML files in source directory
+    html_files = find_html_files(args.source_dir)
+
+    if not html_files:
+        print(f"No HTML files found in {args.source_dir}")
+        return 1
+
+    print(f"Found {len(html_files)} HTML file(s), backend: {args.backend}, workers: {args.workers}\n")
+
+    total_plans = 0
+    records = []
+    started = time.perf_counter()
+
+    for html_file, plan_links, seconds, error in parse_counties(html_files, args.backend, args.workers):
+        print(f"Processing: {html_file.name}")
+
+        if error:
+            print(f"  ✗ Error processing {html_file.name}: {error}\n")
+            continue
+
+        try:
+            output_filename = write_plans(html_file, plan_links, args.output_dir)
+        except Exception as e:
+            print(f"  ✗ Error processing {html_file.name}: {e}\n")
+            continue
+
+        print(f"  ✓ Extracted {len(plan_links)} plans → {output_filename} ({seconds * 1000:.0f} ms)\n")
         total_plans += len(plan_links)
-    
-    except Exception as e:
-        print(f"  ✗ Error processing {html_file.name}: {e}\n")
+        records.extend(parse_plan_name(name, html_file.stem) for name in plan_links)
+
+    if not args.no_records:
+        records_path = args.records or os.path.join(args.output_dir, "plans.arrow")
+        try:
+            write_records(records, records_path)
+            print(f"✓ Wrote {len(records)} structured plan records → {records_path}")
+        except ImportError:
+            print("! pyarrow not installed, skipping structured plan records")
+
+    print(f"{'='*50}")
+    print(f"✓ Complete! Total plans extracted: {total_plans} in {time.perf_counter() - started:.2f}s")
+    return 0
+
 
-print(f"{'='*50}")
-print(f"✓ Complete! Total plans extracted: {total_plans}")
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,25 +1,69 @@
+import argparse
+import asyncio
 import requests
 import json
+import time
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 
+# Ensure output folder is the poli_nm_scrapper directory (same folder as this script)
+OUT_DIR = Path(__file__).resolve().parent
+TARGET_URL_FILE = OUT_DIR.parent / "meta" / "target_url.json"
+CDP_VERSION_URL = "http://localhost:9222/json/version"
 
-# Get WebSocket URL from existing Chrome
-info = requests.get("http://localhost:9222/json/version").json()
-CDP_WS = info["webSocketDebuggerUrl"]
-
-with open(r'C:\Users\acer\OneDrive\Desktop\SIraj\meta\target_url.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
-    TARGET_URLS = data['urls']
+# Plan-benefit links are rendered once the plan table is ready
+READY_SELECTOR = 'a[href*="MedicareAdvantage-2026C-MedicareHealthPlanBenefits.php"]'
 
 # TARGET_URL = "https://q1medicare.com/PartD-SearchMA-Medicare-2026PlanFinder.php?state=TX&countyCode=48085&showCounty=Collin"
 
-def get_html_from_existing_chrome(TAR_URL):
+
+def get_cdp_ws(version_url=CDP_VERSION_URL):
+    """Get WebSocket URL from existing Chrome."""
+    info = requests.get(version_url).json()
+    return info["webSocketDebuggerUrl"]
+
+
+def load_target_urls(path=TARGET_URL_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['urls']
+
+
+def county_file_path(TAR_URL, out_dir=OUT_DIR):
+    """Output path for a target URL, named after its county."""
+    # Prefer explicit showCounty query value as filename; fall back to the raw split
+    try:
+        qs = parse_qs(urlparse(TAR_URL).query)
+        county = qs.get("showCounty", [None])[0]
+    except Exception:
+        county = None
+
+    if not county:
+        county = TAR_URL.split("showCounty=")[-1]
+
+    # sanitize filename minimally
+    safe_name = "".join(c for c in county if c.isalnum() or c in (' ', '_', '-')).rstrip()
+    if not safe_name:
+        safe_name = "output"
+
+    return Path(out_dir) / (safe_name + ".html")
+
+
+def save_html(TAR_URL, html, out_dir=OUT_DIR):
+    file_path = county_file_path(TAR_URL, out_dir)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"✅ Saved: {file_path}")
+    return file_path
+
+
+def get_html_from_existing_chrome(TAR_URL, cdp_ws, out_dir=OUT_DIR):
     with sync_playwright() as p:
         print("Connecting to existing Chrome…")
-        browser = p.chromium.connect_over_cdp(CDP_WS)
+        browser = p.chromium.connect_over_cdp(cdp_ws)
 
         # Use existing context OR create new
         context = browser.contexts[0] if browser.contexts else browser.new_context()
@@ -35,34 +79,104 @@ def get_html_from_existing_chrome(TAR_URL):
 
         print("Saving final HTML…")
 
-        html = page.content()
+        save_html(TAR_URL, page.content(), out_dir)
 
-        # Ensure output folder is the poli_nm_scrapper directory (same folder as this script)
-        out_dir = Path(__file__).resolve().parent
 
-        # Prefer explicit showCounty query value as filename; fall back to the raw split
+async def scrape_tab(page, queue, out_dir, ready_selector, timeout_ms, saved):
+    """Load queued URLs one after another in a single tab; add the ones saved to `saved`."""
+    while True:
         try:
-            qs = parse_qs(urlparse(TAR_URL).query)
-            county = qs.get("showCounty", [None])[0]
-        except Exception:
-            county = None
+            TAR_URL = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
 
-        if not county:
-            county = TAR_URL.split("showCounty=")[-1]
-
-        # sanitize filename minimally
-        safe_name = "".join(c for c in county if c.isalnum() or c in (' ', '_', '-')).rstrip()
-        if not safe_name:
-            safe_name = "output"
-
-        file_path = out_dir / (safe_name + ".html")
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        started = time.perf_counter()
+        try:
+            await page.goto(TAR_URL, wait_until="domcontentloaded", timeout=timeout_ms)
+            try:
+                await page.wait_for_selector(ready_selector, state="attached", timeout=timeout_ms)
+            except PlaywrightTimeoutError:
+                # Usually a Cloudflare challenge; keep the last good <County>.html
+                file_path = county_file_path(TAR_URL, out_dir)
+                side_path = file_path.with_name(file_path.name + ".timeout")
+                with open(side_path, "w", encoding="utf-8") as f:
+                    f.write(await page.content())
+                print(f"  ✗ No plan links after {timeout_ms} ms, page saved to {side_path.name}: {TAR_URL}")
+                continue
+            save_html(TAR_URL, await page.content(), out_dir)
+            saved.add(TAR_URL)
+            print(f"  ({time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"  ✗ Failed: {TAR_URL}: {e}")
+
+
+async def scrape_all(urls, cdp_ws=None, tabs=4, out_dir=OUT_DIR,
+                     ready_selector=READY_SELECTOR, timeout_ms=60000):
+    """Scrape all URLs concurrently over N tabs of one browser session.
+
+    With cdp_ws, tabs are opened in the existing (Cloudflare-cleared) Chrome
+    context; without it a headless Chromium is launched, which is enough for
+    pages served from a local static HTTP server.
+
+    Returns the set of URLs whose page was saved. A page that never showed
+    plan links is written to ``<County>.html.timeout`` instead, leaving the
+    previous ``<County>.html`` in place.
+    """
+    saved = set()
+    queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+
+    async with async_playwright() as p:
+        if cdp_ws:
+            print("Connecting to existing Chrome…")
+            browser = await p.chromium.connect_over_cdp(cdp_ws)
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+        else:
+            browser = await p.chromium.launch()
+            context = await browser.new_context()
+
+        n_tabs = max(1, min(tabs, len(urls)))
+        pages = [await context.new_page() for _ in range(n_tabs)]
+        print(f"Connected. Loading {len(urls)} page(s) in {n_tabs} tab(s)…")
 
-        print(f"✅ Saved: {file_path}")
+        try:
+            await asyncio.gather(*(
+                scrape_tab(page, queue, out_dir, ready_selector, timeout_ms, saved) for page in pages
+            ))
+        finally:
+            for page in pages:
+                await page.close()
+            if not cdp_ws:
+                await browser.close()
+    return saved
 
 
 if __name__ == "__main__":
-    for TAR_URL in TARGET_URLS:
-        
-        get_html_from_existing_chrome(TAR_URL)
+    parser = argparse.ArgumentParser(description="Save Q1Medicare county plan-finder pages as HTML.")
+    parser.add_argument("--targets", default=TARGET_URL_FILE, help="JSON file with a 'urls' list")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--tabs", type=int, default=4, help="concurrent tabs in the browser session")
+    parser.add_argument("--timeout", type=int, default=60000, help="per-page timeout in ms")
+    parser.add_argument("--launch", action="store_true",
+                        help="launch headless Chromium instead of attaching over CDP (local testing)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="old behaviour: one URL at a time in the first tab with a fixed wait")
+    args = parser.parse_args()
+
+    TARGET_URLS = load_target_urls(args.targets)
+
+    if args.sequential:
+        CDP_WS = get_cdp_ws()
+        for TAR_URL in TARGET_URLS:
+            get_html_from_existing_chrome(TAR_URL, CDP_WS, args.out_dir)
+    else:
+        started = time.perf_counter()
+        saved = asyncio.run(scrape_all(
+            TARGET_URLS,
+            cdp_ws=None if args.launch else get_cdp_ws(),
+            tabs=args.tabs,
+            out_dir=args.out_dir,
+            timeout_ms=args.timeout,
+        ))
+        print(f"Done: {len(saved)} of {len(TARGET_URLS)} page(s) saved in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,191 @@
+"""
+Append-only store for search results and incremental doc_links.json builder.
+
+Search responses are appended to ``meta/search_results.jsonl``, one line per
+searched plan with the counties it was fanned out to. Link extraction
+remembers how far into the store it has read, so each run only processes
+records added since the last one, and appends (entry, links) lines to
+``meta/search_links.jsonl``. ``doc_links.json`` is then rebuilt from that
+file in a streaming pass; only a key → file offset map is held in memory.
+A new links file starts from the entries of an existing ``doc_links.json``,
+so a checkout without the search store keeps its links.
+
+    python search_store.py                      # update links, rebuild doc_links.json
+    python search_store.py --import-folder DIR  # backfill old per-query JSON files first
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+META_DIR = Path(__file__).resolve().parent / "meta"
+STORE_FILE = META_DIR / "search_results.jsonl"
+LINKS_FILE = META_DIR / "search_links.jsonl"
+STATE_FILE = META_DIR / "search_links.state.json"
+DOC_LINKS_FILE = Path(__file__).resolve().parent / "doc_links.json"
+
+
+def entry_key(county, plcy_name):
+    """doc_links.json entry name, as produced by the old per-file layout."""
+    return f"{county}_{plcy_name}.json"
+
+
+def extract_links(results):
+    """Links of the organic results of one search response."""
+    return [r["link"] for r in results.get("organic_results", []) if "link" in r]
+
+
+def iter_jsonl(path, offset=0):
+    """Yield (start_offset, end_offset, record) for complete lines from offset on.
+
+    Corrupt lines are skipped. A trailing line without a newline (a write in
+    progress or a crash) is not yielded, so the returned offsets never skip
+    past it.
+    """
+    if not Path(path).exists():
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            start, offset = offset, offset + len(line)
+            try:
+                yield start, offset, json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class SearchStore:
+    """Append-only JSON-lines file of search responses."""
+
+    def __init__(self, path=STORE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, plcy_name, counties, results):
+        record = {
+            "plan": plcy_name,
+            "counties": list(counties),
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def import_folder(self, folder):
+        """Backfill from the old one-JSON-file-per-(county, plan) layout; return files imported."""
+        count = 0
+        for path in sorted(Path(folder).glob("*.json")):
+            county, _, plcy_name = path.stem.partition("_")
+            with open(path, encoding="utf-8") as f:
+                self.append(plcy_name, [county], json.load(f))
+            count += 1
+        return count
+
+
+class LinkIndex:
+    """Incremental (entry -> links) index built from a SearchStore."""
+
+    def __init__(self, store, links_path=LINKS_FILE, state_path=STATE_FILE, doc_links_path=DOC_LINKS_FILE):
+        self.store = store
+        self.links_path = Path(links_path)
+        self.state_path = Path(state_path)
+        self.doc_links_path = Path(doc_links_path)
+
+    def _load_offset(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)["store_offset"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return 0
+
+    def _save_offset(self, offset):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"store_offset": offset}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def seed(self, out):
+        """Copy the entries of an existing doc_links.json into a new links file; return how many."""
+        if not self.doc_links_path.exists():
+            return 0
+        try:
+            with open(self.doc_links_path, encoding="utf-8") as f:
+                doc_links = json.load(f)
+        except json.JSONDecodeError:
+            return 0
+        for key, links in doc_links.items():
+            out.write(json.dumps({"key": key, "links": links}, ensure_ascii=False) + "\n")
+        return len(doc_links)
+
+    def update(self):
+        """Extract links from store records added since the last update; return how many."""
+        offset = self._load_offset()
+        added = 0
+        self.links_path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.links_path.exists()
+        with open(self.links_path, "a", encoding="utf-8") as out:
+            if is_new:
+                # Earlier searches live only in doc_links.json; newer results override them
+                self.seed(out)
+            for _, offset, record in iter_jsonl(self.store.path, offset):
+                links = extract_links(record.get("results", {}))
+                for county in record.get("counties", []):
+                    key = entry_key(county, record["plan"])
+                    out.write(json.dumps({"key": key, "links": links}, ensure_ascii=False) + "\n")
+                    added += 1
+        self._save_offset(offset)
+        return added
+
+    def build_doc_links(self, out_path=None):
+        """Stream the latest links per entry into a doc_links.json; return the entry count.
+
+        With no links at all the existing file is left alone.
+        """
+        out_path = out_path or self.doc_links_path
+        # Pass 1: remember where the latest line for each key starts
+        latest = {}
+        for start, _, record in iter_jsonl(self.links_path):
+            latest[record["key"]] = start
+        if not latest:
+            return 0
+
+        # Pass 2: copy those lines into the output one at a time
+        tmp_path = Path(out_path).with_suffix(".tmp")
+        with open(self.links_path, "rb") as src, open(tmp_path, "w", encoding="utf-8") as out:
+            out.write("{")
+            for i, (key, offset) in enumerate(latest.items()):
+                src.seek(offset)
+                record = json.loads(src.readline())
+                entry = json.dumps({key: record["links"]}, indent=4, ensure_ascii=False)
+                out.write(("," if i else "") + entry[1:-2])
+            out.write("\n}")
+        os.replace(tmp_path, out_path)
+        return len(latest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update search links and rebuild doc_links.json.")
+    parser.add_argument("--store", default=STORE_FILE)
+    parser.add_argument("--out", default=DOC_LINKS_FILE)
+    parser.add_argument("--import-folder", help="import old per-query JSON files into the store first")
+    args = parser.parse_args()
+
+    store = SearchStore(args.store)
+    if args.import_folder:
+        print(f"Imported {store.import_folder(args.import_folder)} file(s) from {args.import_folder}")
+
+    index = LinkIndex(store, doc_links_path=args.out)
+    print(f"Extracted links for {index.update()} new entr(ies)")
+    written = index.build_doc_links()
+    if written:
+        print(f"✓ Wrote {written} entries → {args.out}")
+    else:
+        print(f"No search links yet; {args.out} left as is")
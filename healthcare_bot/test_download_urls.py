@@ -0,0 +1,191 @@
+"""
+Retry, circuit breaker, retry queue and per-entry dedup behaviour of
+download_urls.py against a local fake HTTP server.
+
+    python -m unittest test_download_urls       # from healthcare_bot/
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from download_urls import CircuitBreaker, URLDownloader, backoff_delay, retry_after_seconds
+
+BODY = b"%PDF-1.4 fake plan document"
+
+
+class FakeCarrier(BaseHTTPRequestHandler):
+    """Answers 500 to the first ``failures`` requests, then serves BODY at every path.
+
+    /redir redirects to /doc.pdf.
+    """
+
+    failures = 0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests += 1
+            failing = type(self).requests <= self.failures
+        if failing:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/redir":
+            self.send_response(302)
+            self.send_header("Location", "/doc.pdf")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=2, cooldown=10, clock=self.clock)
+
+    def trip(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.breaker.failure("h")
+            self.breaker.failure("h")
+
+    def test_opens_after_threshold(self):
+        self.assertTrue(self.breaker.allow("h"))
+        self.trip()
+        self.assertFalse(self.breaker.allow("h"))
+        self.assertEqual(self.breaker.reopens_in("h"), 10)
+
+    def test_half_open_lets_one_probe_through(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow("h"))
+        self.assertFalse(self.breaker.allow("h"))
+        self.breaker.success("h")
+        self.assertTrue(self.breaker.allow("h"))
+
+    def test_failed_probe_reopens_with_longer_cooldown(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow("h"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.breaker.failure("h")
+        self.assertFalse(self.breaker.allow("h"))
+        self.assertEqual(self.breaker.reopens_in("h"), 20)
+
+    def test_released_probe_lets_the_next_one_through(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow("h"))
+        self.breaker.release("h")
+        self.assertTrue(self.breaker.allow("h"))
+
+
+class BackoffTest(unittest.TestCase):
+    def test_retry_after(self):
+        self.assertEqual(retry_after_seconds("7"), 7.0)
+        self.assertEqual(retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(retry_after_seconds("soon"))
+        self.assertEqual(backoff_delay(3, retry_after=7.0), 7.0)
+
+    def test_jitter_stays_under_cap(self):
+        for attempt in range(1, 10):
+            self.assertLessEqual(backoff_delay(attempt, base=1.0, cap=4.0), 4.0)
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        FakeCarrier.failures = 0
+        FakeCarrier.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCarrier)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.output_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def downloader(self, **options):
+        return URLDownloader(None, self.output_dir, timeout=5, backoff_base=0.01,
+                             breaker_threshold=2, breaker_cooldown=0.2, **options)
+
+    def run_downloads(self, downloader, data, timeout=10):
+        """download_all in a thread; fail the test instead of hanging."""
+        worker = threading.Thread(target=lambda: downloader.download_all(data), daemon=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker.start()
+            worker.join(timeout)
+        self.assertFalse(worker.is_alive(), "download_all did not finish")
+
+    def test_half_open_probe_recovers_host(self):
+        FakeCarrier.failures = 2
+        data = {"PlanA.json": [f"{self.base}/a.pdf", f"{self.base}/b.pdf", f"{self.base}/c.pdf"]}
+        downloader = self.downloader()
+        self.run_downloads(downloader, data)
+        self.assertEqual(downloader.stats["successful"], 3)
+        self.assertEqual(downloader.stats["failed"], 0)
+        self.assertEqual(len(downloader.retry_queue), 0)
+        self.assertEqual((self.output_dir / "PlanA.json" / "a.pdf").read_bytes(), BODY)
+
+    def test_probe_with_unexpected_error_does_not_hang(self):
+        FakeCarrier.failures = 2
+        data = {"PlanA.json": [f"{self.base}/a.pdf", f"{self.base}/b.pdf"]}
+        downloader = self.downloader()
+        store_blob = downloader.store_blob
+        calls = []
+
+        def disk_full_once(part_path, sha256):
+            calls.append(part_path)
+            if len(calls) == 1:
+                raise OSError(28, "No space left on device")
+            return store_blob(part_path, sha256)
+
+        downloader.store_blob = disk_full_once
+        self.run_downloads(downloader, data)
+        self.assertEqual(downloader.stats["failed"], 1)
+        self.assertEqual(downloader.stats["successful"], 1)
+        self.assertFalse(downloader.breaker.hosts[f"127.0.0.1:{self.server.server_port}"]["probing"])
+
+    def test_dead_host_goes_to_retry_queue(self):
+        FakeCarrier.failures = 10 ** 6
+        data = {"PlanA.json": [f"{self.base}/a.pdf", f"{self.base}/b.pdf"]}
+        downloader = self.downloader(max_retries=2, max_retry_after=0.5)
+        self.run_downloads(downloader, data)
+        self.assertEqual(downloader.stats["failed"], 2)
+        queue = json.loads((self.output_dir / "retry_queue.json").read_text(encoding="utf-8"))
+        self.assertEqual(set(queue["PlanA.json"]), set(data["PlanA.json"]))
+        self.assertEqual(downloader.retry_queue.doc_links(), data)
+
+    def test_one_file_per_document_per_entry(self):
+        # PlanB reaches /doc.pdf through a redirect nobody has seen yet and directly
+        data = {"PlanA.json": [f"{self.base}/redir"],
+                "PlanB.json": [f"{self.base}/redir", f"{self.base}/doc.pdf"]}
+        for _ in range(2):
+            self.run_downloads(self.downloader(), data)
+            self.assertEqual(sorted(p.name for p in (self.output_dir / "PlanA.json").iterdir()), ["doc.pdf"])
+            self.assertEqual(sorted(p.name for p in (self.output_dir / "PlanB.json").iterdir()), ["doc.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
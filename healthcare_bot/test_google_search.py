@@ -0,0 +1,81 @@
+"""
+Search cache behaviour of google_Search.py with a stub search client (no
+SerpAPI calls, no quota spent).
+
+    python -m unittest test_google_search       # from healthcare_bot/
+"""
+
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from google_Search import SearchCache, build_params, cached_search, normalize_query
+
+
+class StubClient:
+    """Records the queries it is asked and answers each with one organic result."""
+
+    def __init__(self, error=None):
+        self.queries = []
+        self.error = error
+
+    def __call__(self, params):
+        self.queries.append(params["q"])
+        if self.error:
+            return {"error": self.error}
+        return {"organic_results": [{"link": f"https://example.com/{len(self.queries)}.pdf"}]}
+
+
+class SearchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "cache.sqlite"
+        self.cache = SearchCache(self.path)
+        self.addCleanup(self.cache.close)
+        self.client = StubClient()
+
+    def test_miss_then_hit(self):
+        params = build_params("Plan A (HMO)")
+        results, from_cache = cached_search(params, self.cache, self.client)
+        self.assertFalse(from_cache)
+        self.assertEqual(cached_search(params, self.cache, self.client), (results, True))
+        self.assertEqual(len(self.client.queries), 1)
+
+    def test_key_folds_case_and_whitespace(self):
+        cached_search(build_params("Plan A (HMO)"), self.cache, self.client)
+        _, from_cache = cached_search(build_params("plan  a (hmo)"), self.cache, self.client)
+        self.assertTrue(from_cache)
+        self.assertEqual(len(self.client.queries), 1)
+
+    def test_errors_are_not_cached(self):
+        params = build_params("Plan A (HMO)")
+        failing = StubClient(error="quota exceeded")
+        self.assertEqual(cached_search(params, self.cache, failing), ({"error": "quota exceeded"}, False))
+        _, from_cache = cached_search(params, self.cache, self.client)
+        self.assertFalse(from_cache)
+
+    def test_expired_entry_is_searched_again(self):
+        params = build_params("Plan A (HMO)")
+        cached_search(params, self.cache, self.client)
+        self.cache.ttl = 0
+        time.sleep(0.01)
+        _, from_cache = cached_search(params, self.cache, self.client)
+        self.assertFalse(from_cache)
+        self.assertEqual(len(self.client.queries), 2)
+
+    def test_expired_entries_are_evicted_on_open(self):
+        for name in ("Plan A (HMO)", "Plan B (PPO)"):
+            cached_search(build_params(name), self.cache, self.client)
+        with sqlite3.connect(self.path) as db:
+            db.execute("UPDATE search_cache SET fetched_at = 0 WHERE query = ?",
+                       (normalize_query(build_params("Plan A (HMO)")),))
+        reopened = SearchCache(self.path)
+        self.addCleanup(reopened.close)
+        count, = reopened._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        self.assertEqual(count, 1)
+        self.assertIsNone(reopened.get(normalize_query(build_params("Plan A (HMO)"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+scrape_all (the ``--launch`` path of policy_nm_scrapper_from_q1.py) against
+static county pages served from a temp dir. Skipped when Playwright or its
+Chromium build is not installed.
+
+    python -m unittest test_scraper       # from healthcare_bot/
+"""
+
+import asyncio
+import contextlib
+import functools
+import io
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "poli_nm_scrapper"))
+
+try:
+    from playwright.sync_api import Error as PlaywrightError, sync_playwright
+    from policy_nm_scrapper_from_q1 import scrape_all
+except ImportError:
+    scrape_all = None
+
+PLAN_PAGE = ('<html><body><table><tr><td><a href="/MedicareAdvantage-2026C-MedicareHealthPlanBenefits.php'
+             '?plan=H1234-001">Plan A</a></td></tr></table></body></html>')
+EMPTY_PAGE = "<html><body><p>Loading plans...</p></body></html>"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def chromium_available():
+    if scrape_all is None:
+        return False
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch().close()
+    except PlaywrightError:
+        return False
+    return True
+
+
+class ScrapeAllTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not chromium_available():
+            raise unittest.SkipTest("playwright with Chromium is not installed")
+
+    def setUp(self):
+        site = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        (site / "plans.html").write_text(PLAN_PAGE, encoding="utf-8")
+        (site / "empty.html").write_text(EMPTY_PAGE, encoding="utf-8")
+        handler = functools.partial(QuietHandler, directory=str(site))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.out_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def scrape(self, urls):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(scrape_all(urls, cdp_ws=None, tabs=2, out_dir=self.out_dir, timeout_ms=2000))
+
+    def test_saves_each_county_page(self):
+        urls = [f"{self.base}/plans.html?state=TX&showCounty=Collin",
+                f"{self.base}/plans.html?state=TX&showCounty=Dallas"]
+        self.assertEqual(self.scrape(urls), set(urls))
+        for county in ("Collin", "Dallas"):
+            html = (self.out_dir / f"{county}.html").read_text(encoding="utf-8")
+            self.assertIn("MedicareAdvantage-2026C-MedicareHealthPlanBenefits.php", html)
+
+    def test_page_without_plan_links_goes_to_side_file(self):
+        (self.out_dir / "Collin.html").write_text(PLAN_PAGE, encoding="utf-8")
+        url = f"{self.base}/empty.html?state=TX&showCounty=Collin"
+        self.assertEqual(self.scrape([url]), set())
+        self.assertEqual((self.out_dir / "Collin.html").read_text(encoding="utf-8"), PLAN_PAGE)
+        self.assertIn("Loading plans", (self.out_dir / "Collin.html.timeout").read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()